@@ -4,6 +4,7 @@ __all__ = ["index", "modules", "custom_doc_links", "git_url"]
 
 index = {"Dashboard": "core.dashboards.ipynb",
          "Gallery": "core.dashboards.ipynb",
+         "ThumbnailGallery": "core.dashboards.ipynb",
          "DatasetOverview": "core.dashboards.ipynb",
          "MultiDatasetOverview": "core.dashboards.ipynb",
          "DatasetComparison": "core.dashboards.ipynb",
@@ -13,10 +14,18 @@ index = {"Dashboard": "core.dashboards.ipynb",
          "DatasetGenerator": "core.dashboards.ipynb",
          "DatasetGeneratorScatter": "core.dashboards.ipynb",
          "Observable": "core.data.ipynb",
+         "ListChange": "core.data.ipynb",
          "ObservableList": "core.data.ipynb",
+         "Crossfilter": "core.data.ipynb",
          "DatasetDescriptor": "core.data.ipynb",
          "StringDescriptor": "core.data.ipynb",
          "GenericDataset": "core.data.ipynb",
+         "get_file_metadata": "core.data.ipynb",
+         "collect_file_metadata": "core.data.ipynb",
+         "get_files_fingerprint": "core.data.ipynb",
+         "ThumbnailStore": "core.data.ipynb",
+         "write_array_file": "core.data.ipynb",
+         "read_array_file": "core.data.ipynb",
          "ObjectDetectionDatasetOverview": "dashboards.ipynb",
          "ObjectDetectionDatasetComparison": "dashboards.ipynb",
          "ObjectDetectionDatasetGeneratorScatter": "dashboards.ipynb",
@@ -26,6 +35,7 @@ index = {"Dashboard": "core.dashboards.ipynb",
          "BboxRecordDataframeParser": "data.ipynb",
          "MaskRecordDataframeParser": "data.ipynb",
          "RecordDataset": "data.ipynb",
+         "BboxRecordColumns": "data.ipynb",
          "DataDescriptorBbox": "data.ipynb",
          "StatsDescriptorBbox": "data.ipynb",
          "ImageStatsDescriptorBbox": "data.ipynb",
@@ -33,10 +43,15 @@ index = {"Dashboard": "core.dashboards.ipynb",
          "GalleryStatsDescriptorBbox": "data.ipynb",
          "BboxRecordDataset": "data.ipynb",
          "PrecisionRecallMetricsDescriptorObjectDetection": "data.ipynb",
+         "ImageIndexDescriptor": "data.ipynb",
          "ObjectDetectionResultsDataset": "data.ipynb",
+         "ObjectDetectionResultsStore": "data.ipynb",
+         "DetectionBoxes": "metrics.ipynb",
+         "MatchState": "metrics.ipynb",
          "AP": "metrics.ipynb",
          "APObjectDetection": "metrics.ipynb",
          "APObjectDetectionFast": "metrics.ipynb",
+         "calculate_class_metric_data_from_shared_memory": "metrics.ipynb",
          "Filter": "plotting.controls.ipynb",
          "RangeFilter": "plotting.controls.ipynb",
          "CategoricalFilter": "plotting.controls.ipynb",
@@ -52,11 +67,18 @@ index = {"Dashboard": "core.dashboards.ipynb",
          "categorical_2d_histogram": "plotting.core.ipynb",
          "categorical_2d_histogram_with_gui": "plotting.core.ipynb",
          "scatter_plot_with_gui": "plotting.core.ipynb",
+         "RasterizedScatterPlot": "plotting.core.ipynb",
          "plots_as_matrix": "plotting.core.ipynb",
          "toggle_legend_js": "plotting.utils.ipynb",
          "calculate_mixing_matrix": "plotting.utils.ipynb",
          "get_min_and_max_dates": "plotting.utils.ipynb",
          "convert_rgb_image_to_bokeh_rgb_image": "plotting.utils.ipynb",
+         "get_display_scale": "plotting.utils.ipynb",
+         "open_img_at_display_size": "plotting.utils.ipynb",
+         "scale_record_to_img": "plotting.utils.ipynb",
+         "points_in_polygon": "plotting.utils.ipynb",
+         "rasterize_points": "plotting.utils.ipynb",
+         "shade_counts": "plotting.utils.ipynb",
          "draw_record_with_bokeh": "plotting.utils.ipynb"}
 
 modules = ["core/dashboards.py",
@@ -1,14 +1,17 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/core.dashboards.ipynb (unless otherwise specified).
 
-__all__ = ['Dashboard', 'Gallery', 'DatasetOverview', 'MultiDatasetOverview', 'DatasetComparison', 'DatasetFilter',
-           'DatasetFilterWithRangeSliderAndMultiSelect', 'DatasetFilterWithScatter', 'DatasetGenerator',
-           'DatasetGeneratorScatter']
+__all__ = ['Dashboard', 'Gallery', 'ThumbnailGallery', 'DatasetOverview', 'MultiDatasetOverview', 'DatasetComparison',
+           'DatasetFilter', 'DatasetFilterWithRangeSliderAndMultiSelect', 'DatasetFilterWithScatter',
+           'DatasetGenerator', 'DatasetGeneratorScatter']
 
 # Cell
-from typing import List, Union, Optional
+from typing import List, Union, Optional, Iterable
 from abc import ABC, abstractmethod
 from math import floor, ceil
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
@@ -37,10 +40,17 @@ class Dashboard(ABC):
 
 # Cell
 class Gallery(Dashboard):
-    """Creates a gallery for a dataset with sorting options if a gallyer_descriptor is provided. Requires the dataset to implement the function `get_image_by_image_id` and an attribute `num_images`."""
-    def __init__(self, dataset, gallery_desciptor, img_id_col, sort_cols=None, width=500, height=500):
+    """Creates a gallery for a dataset with sorting options if a gallyer_descriptor is provided. Requires the dataset to implement the function `get_image_by_image_id` and an attribute `num_images`.
+    The last `cache_size` rendered images are kept in a cache and the next and previous `num_prefetch` images of the current sort order are rendered in a background thread."""
+    def __init__(self, dataset, gallery_desciptor, img_id_col, sort_cols=None, width=500, height=500, cache_size: int = 32, num_prefetch: int = 2):
         """The dataset need to have a property num_images."""
         self.dataset = dataset
+        self.cache_size = cache_size
+        self.num_prefetch = num_prefetch if cache_size > 0 else 0
+        self._render_cache = OrderedDict()
+        self._pending_renders = {}
+        self._cache_lock = threading.Lock()
+        self._prefetch_executor = None
         self.sort_cols = sort_cols
         self.gallery_desciptor = gallery_desciptor
         self.img_id_col = img_id_col
@@ -53,9 +63,68 @@ class Gallery(Dashboard):
         super().__init__(width, height)
 
     def get_image_by_index(self, index):
-        """Converts index to image_id and calls the `get_image_by_image_id` function."""
+        """Converts index to image_id and returns the rendered image from the cache or calls the `get_image_by_image_id` function.
+        Afterwards the neighbouring images are prefetched."""
+        image = self.get_cached_image(self.get_render_key(index))
+        self.prefetch(index)
+        return image
+
+    def get_render_key(self, index):
+        """Key of the rendered image in the cache, the image_id and the display size."""
         height_subtracor = 50 if self.sort_cols is None else 100
-        return self.dataset.get_image_by_image_id(self.index_mapping.iloc[index][self.img_id_col], width=self.width, height=self.height-height_subtracor)
+        return self.index_mapping.iloc[index][self.img_id_col], self.width, self.height-height_subtracor
+
+    def render_image(self, render_key):
+        image_id, width, height = render_key
+        return self.dataset.get_image_by_image_id(image_id, width=width, height=height)
+
+    def get_cached_image(self, render_key):
+        if self.cache_size <= 0:
+            return self.render_image(render_key)
+        with self._cache_lock:
+            if render_key in self._render_cache:
+                self._render_cache.move_to_end(render_key)
+                return self._render_cache[render_key]
+            pending_render = self._pending_renders.get(render_key)
+        # wait for the prefetch of the image instead of rendering it twice
+        image = pending_render.result() if pending_render is not None else self.render_image(render_key)
+        self._add_to_cache(render_key, image)
+        return image
+
+    def _add_to_cache(self, render_key, image):
+        with self._cache_lock:
+            self._render_cache[render_key] = image
+            self._render_cache.move_to_end(render_key)
+            while len(self._render_cache) > self.cache_size:
+                self._render_cache.popitem(last=False)
+
+    def _prefetch_render(self, render_key):
+        try:
+            image = self.render_image(render_key)
+            self._add_to_cache(render_key, image)
+            return image
+        finally:
+            with self._cache_lock:
+                self._pending_renders.pop(render_key, None)
+
+    def prefetch(self, index):
+        """Renders the next and previous `num_prefetch` images of `index` in a background thread, the closest images first."""
+        if self.num_prefetch <= 0 or self.num_images <= 1:
+            return
+        if self._prefetch_executor is None:
+            self._prefetch_executor = ThreadPoolExecutor(1)
+        for distance in range(1, min(self.num_prefetch, self.num_images-1)+1):
+            for neighbour in [(index + distance) % self.num_images, (index - distance) % self.num_images]:
+                render_key = self.get_render_key(neighbour)
+                with self._cache_lock:
+                    if render_key in self._render_cache or render_key in self._pending_renders:
+                        continue
+                    self._pending_renders[render_key] = self._prefetch_executor.submit(self._prefetch_render, render_key)
+
+    def clear_cache(self):
+        """Removes all rendered images from the cache, e.g. after the dataset changed."""
+        with self._cache_lock:
+            self._render_cache.clear()
 
     def update_sorting(self, event):
         """Calculates the new index order for sorting."""
@@ -64,11 +133,20 @@ class Gallery(Dashboard):
         if "Drop duplicates" in self.sort_order.value:
             data = data.drop_duplicates(self.img_id_col)
         self.num_images = data.shape[0]
-        self.image_count = pn.Row("/" + str(self.num_images), width=int(self.width/6))
+        self.image_count = pn.Row("/" + str(self.num_positions), width=int(self.width/6))
         self.gui[0][1][2] = self.image_count
         self.index_mapping = data.reset_index(drop=True)
 
-    def build_gui(self):
+    @property
+    def num_positions(self):
+        """Number of positions of the gallery controlls, one per image."""
+        return self.num_images
+
+    def show_position(self, index):
+        self.image = pn.Row(self.get_image_by_index(index), align="center")
+
+    def build_controlls(self):
+        """Creates the sorting options and the buttons to move through the gallery."""
         if self.sort_cols is not None:
             self.sorter = pnw.Select(name="Sort by", options=self.sort_cols)
             self.sorter.param.watch(self.update_sorting, "value")
@@ -79,18 +157,21 @@ class Gallery(Dashboard):
         self.btn_prev = pnw.Button(name="<", width=int(2*self.width/6))
         self.btn_next = pnw.Button(name=">", width=int(2*self.width/6))
         self.current = pnw.TextInput(value="1", width=int(self.width/6))
-        self.image_count = pn.Row("/" + str(self.num_images), width=int(self.width/6))
+        self.image_count = pn.Row("/" + str(self.num_positions), width=int(self.width/6))
         if self.sort_cols is not None:
             self.gui_controlls = pn.Column(self.sort_gui, pn.Row(self.btn_prev, self.current, self.image_count, self.btn_next, align="center", height=50))
         else:
             self.gui_controlls = pn.Row(self.btn_prev, self.current, self.image_count, self.btn_next, align="center", height=50)
-        self._image = pn.Row(self.get_image_by_index(int(self.current.value)-1), align="center")
-        self.gui = pn.Column(self.gui_controlls, self.image)
 
         self.btn_prev.on_click(self._previous)
         self.btn_next.on_click(self._next)
         self.current.param.watch(self._number_input, "value")
 
+    def build_gui(self):
+        self.build_controlls()
+        self._image = pn.Row(self.get_image_by_index(int(self.current.value)-1), align="center")
+        self.gui = pn.Column(self.gui_controlls, self.image)
+
     @property
     def image(self):
         return self._image
@@ -103,26 +184,26 @@ class Gallery(Dashboard):
     def _next(self, _):
         """Logic for the next button"""
         index = int(self.current.value)
-        if index == self.num_images:
+        if index == self.num_positions:
             index = 1
         else:
             index += 1
         self.UPDATING = True
         self.current.value = str(index)
         self.UPDATING = False
-        self.image = pn.Row(self.get_image_by_index(index-1), align="center")
+        self.show_position(index-1)
 
     def _previous(self, _):
         """Logic for the previous button"""
         index = int(self.current.value)
         if index == 1:
-            index = self.num_images
+            index = self.num_positions
         else:
             index -= 1
         self.UPDATING = True
         self.current.value = str(index)
         self.UPDATING = False
-        self.image = pn.Row(self.get_image_by_index(index-1), align="center")
+        self.show_position(index-1)
 
     def _number_input(self, _):
         """Logic for the number input."""
@@ -130,11 +211,104 @@ class Gallery(Dashboard):
         if self.UPDATING:
             return
         index = int(self.current.value)
-        self.image = pn.Row(self.get_image_by_index(index-1), align="center")
+        self.show_position(index-1)
 
     def show(self):
         return self.gui
 
+# Cell
+class ThumbnailGallery(Gallery):
+    """Gallery that shows pages of `num_rows` x `num_cols` thumbnails instead of a single image. The thumbnails are created from the filepaths in the `filepath_col`
+    (`img_id_col` if None) of the gallery descriptor with the `thumbnail_store`, the thumbnails of the next page are created in a background thread.
+    The button below a thumbnail shows the image rendered with `get_image_by_image_id` below the thumbnails."""
+    DEFAULT_THUMBNAIL_PATH = os.path.join(os.path.expanduser("~"), ".cache", "icevision_dashboards", "thumbnails")
+
+    def __init__(self, dataset, gallery_desciptor, img_id_col, sort_cols=None, width=500, height=500, num_rows: int = 3, num_cols: int = 4,
+                 thumbnail_store: Optional[ThumbnailStore] = None, filepath_col: Optional[str] = None, cache_size: int = 32, num_prefetch: int = 2):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.thumbnail_store = ThumbnailStore(self.DEFAULT_THUMBNAIL_PATH) if thumbnail_store is None else thumbnail_store
+        self.filepath_col = img_id_col if filepath_col is None else filepath_col
+        self._thumbnail_executor = None
+        self._pending_thumbnails = None
+        super().__init__(dataset, gallery_desciptor, img_id_col, sort_cols, width, height, cache_size, num_prefetch)
+
+    @property
+    def page_size(self):
+        return self.num_rows*self.num_cols
+
+    @property
+    def num_positions(self):
+        """Number of pages."""
+        return max(ceil(self.num_images/self.page_size), 1)
+
+    def get_page_indices(self, page) -> range:
+        return range(page*self.page_size, min((page+1)*self.page_size, self.num_images))
+
+    def get_thumbnail_paths(self, page) -> List[Optional[str]]:
+        page_indices = self.get_page_indices(page)
+        return self.thumbnail_store.get_thumbnails(self.index_mapping[self.filepath_col].iloc[page_indices.start:page_indices.stop])
+
+    def prefetch_thumbnails(self, page):
+        """Creates the thumbnails of `page` in a background thread."""
+        if self.num_positions <= 1:
+            return
+        if self._thumbnail_executor is None:
+            self._thumbnail_executor = ThreadPoolExecutor(1)
+        self._pending_thumbnails = self._thumbnail_executor.submit(self.get_thumbnail_paths, page % self.num_positions)
+
+    def get_page_grid(self, page):
+        """Returns a grid with the thumbnails of `page` and a button for each thumbnail, that shows the image."""
+        cell_width = int(self.width/self.num_cols) - 10
+        cells = []
+        for index, thumbnail_path in zip(self.get_page_indices(page), self.get_thumbnail_paths(page)):
+            if thumbnail_path is not None:
+                thumbnail = pn.pane.JPG(thumbnail_path, width=cell_width)
+            else:
+                thumbnail = pn.pane.Str(str(self.index_mapping.iloc[index][self.img_id_col]), width=cell_width)
+            button = pnw.Button(name=str(index+1), width=cell_width)
+            button.on_click(lambda event, index=index: self.show_image(index))
+            cells.append(pn.Column(thumbnail, button))
+        self.prefetch_thumbnails(page+1)
+        return pn.GridBox(*cells, ncols=self.num_cols)
+
+    def show_position(self, index):
+        self.grid = self.get_page_grid(index)
+
+    def show_image(self, index):
+        self.image = pn.Row(self.get_image_by_index(index), align="center")
+
+    def update_sorting(self, event):
+        super().update_sorting(event)
+        self.UPDATING = True
+        self.current.value = "1"
+        self.UPDATING = False
+        self.show_position(0)
+
+    def build_gui(self):
+        self.build_controlls()
+        self._grid = self.get_page_grid(int(self.current.value)-1)
+        self._image = pn.Row(align="center")
+        self.gui = pn.Column(self.gui_controlls, self.grid, self.image)
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        self._grid = grid
+        self.gui[1] = self._grid
+
+    @property
+    def image(self):
+        return self._image
+
+    @image.setter
+    def image(self, image):
+        self._image = image
+        self.gui[2] = self._image
+
 # Cell
 class DatasetOverview(Dashboard):
     """Provides a genric overview dashboard for datasets."""
@@ -189,12 +363,21 @@ class MultiDatasetOverview(Dashboard):
             self.gui = pn.Column(self.overview_table)
 
     def delete_entry(self, clicks):
-        selection = self.overview_table.selection
-        self.datasets.list = [dataset for index, dataset in enumerate(self.datasets) if index not in selection]
+        self.datasets.delete_indices(self.overview_table.selection)
 
     def update_table(self, event):
+        """Updates the table once per change of the datasets, the selection is moved with the selected datasets (see `ObservableList.last_change`)."""
+        change = getattr(event, "last_change", None)
+        selection = self.overview_table.selection
+        if change is not None:
+            new_indices = {origin: index for index, origin in enumerate(change.origins) if origin is not None}
+            selection = [new_indices[index] for index in selection if index in new_indices]
+            if len(selection) == 0 and len(self.datasets) > 0:
+                selection = [change.added[-1] if len(change.added) > 0 else 0]
         self.overview_table.value = self.create_overview_df()
-        self.overview_table.height = height=self.height-25
+        self.overview_table.height = self.height-25
+        if len(selection) > 0:
+            self.overview_table.selection = selection
 
     def show(self):
         return self.gui
@@ -231,7 +414,8 @@ class DatasetComparison(Dashboard):
 
 # Cell
 class DatasetFilter(Dashboard, ABC):
-    """Abstract base class for generic filters on datasets. Allows for filtering of data using different controlls, for more on controlls see: `plotting.controlls`."""
+    """Abstract base class for generic filters on datasets. Allows for filtering of data using different controlls, for more on controlls see: `plotting.controlls`.
+    The selections of the filters are combined with a `Crossfilter`, when a filter changes the other filters are updated with the rows selected by all filters except themselves."""
     DESCRIPTOR_DATA = "data"
 
     def __init__(self, dataset: GenericDataset, columns: Optional[List[str]] = None, height: int = 500, width: int = 500, filter_width: Optional[int] = None, filter_height: Optional[int] = None, n_cols: int = None):
@@ -242,6 +426,9 @@ class DatasetFilter(Dashboard, ABC):
         self.filter_height = int(height/self.n_rows) if filter_height is None else filter_height
         self.filter_width = int(width/self.n_cols) if filter_width is None else filter_width
         self.filters = []
+        self.crossfilter = None
+        # the masks the filters were last updated with
+        self.filter_masks = []
         self.UPDATING = False
         super().__init__(height=height, width=width)
 
@@ -253,38 +440,74 @@ class DatasetFilter(Dashboard, ABC):
         self.gui = pn.GridSpec(ncols=self.n_cols, nrows=self.n_rows, width=self.width, height=self.height)
         for index, gui_filter in enumerate(self.filters):
             self.gui[index//self.n_cols, index%self.n_cols] = gui_filter.show()
-        # hook all control elements to the update functions
-        for single_filter in self.filters:
-            single_filter.register_callback(self.update_plots)
+        self.build_crossfilter(data_selection.shape[0])
+
+    def build_crossfilter(self, num_rows):
+        """Adds all filters to a new `Crossfilter` and hooks them to the update functions."""
+        self.crossfilter = Crossfilter(num_rows)
+        self.filter_masks = [None]*len(self.filters)
+        for filter_index, single_filter in enumerate(self.filters):
+            self.crossfilter.add_filter(single_filter.get_selection())
+            single_filter.register_callback(lambda selection, filter_index=filter_index: self.update_plots(selection, filter_index=filter_index))
 
     @abstractmethod
     def generate_filters(self, dataselection):
         """Write handler for the different column types of the datagrame."""
         pass
 
-    def _update_plots(self, current_selection):
-        mask = np.array(self.get_selection())
-        final_mask = np.logical_or(mask, current_selection)
-        for single_filter in self.filters:
-            single_filter.update_with_mask(final_mask)
-
-    def update_plots(self, event, old=None, new=None):
+    def _update_plots(self, current_selection, filter_index):
+        changed_rows = self.crossfilter.update_filter(filter_index, current_selection)
+        self.update_filters(self.crossfilter.get_affected_filters(filter_index, changed_rows))
+
+    def update_filter_with_mask(self, index: int) -> bool:
+        """Updates filter `index` with the rows selected by the other filters. Returns True if the filter changed its own selection."""
+        mask = self.crossfilter.get_selection(exclude=index)
+        self.filters[index].update_with_mask(mask)
+        self.filter_masks[index] = mask
+        return len(self.crossfilter.update_filter(index, self.filters[index].get_selection())) > 0
+
+    def update_filters(self, filter_indices: Iterable[int]):
+        """Updates the filters with the rows selected by the other filters. Filters can change their own selection in `update_with_mask`
+        (e.g. the CategoricalFilter drops categories without rows), then the filters whose masks are outdated are updated again."""
+        # at most one pass per filter, in case the selections of the filters don't settle
+        for _ in range(len(self.filters)):
+            selection_changed = False
+            for index in filter_indices:
+                selection_changed |= self.update_filter_with_mask(index)
+            if not selection_changed:
+                break
+            filter_indices = [
+                index for index in range(len(self.filters)) if not np.array_equal(self.crossfilter.get_selection(exclude=index), self.filter_masks[index])
+            ]
+
+    def update_plots(self, event, old=None, new=None, filter_index=None):
         if self.UPDATING:
             return
         else:
             self.UPDATING = True
-            self._update_plots(event)
-            self.UPDATING = False
+            try:
+                if filter_index is None:
+                    self.refresh()
+                else:
+                    self._update_plots(event, filter_index)
+            finally:
+                self.UPDATING = False
+
+    def refresh(self):
+        """Updates the crossfilter with the selections of all filters and all filters with the rows selected by the other filters."""
+        for index, single_filter in enumerate(self.filters):
+            self.crossfilter.update_filter(index, single_filter.get_selection())
+        self.update_filters(range(len(self.filters)))
 
     def show(self):
         return self.gui
 
     def get_selection(self):
         """Returns binary mask that combines all filter masks with an `and`"""
-        mask = self.filters[0].get_selection()
-        for single_filter in self.filters[1:]:
-            mask = np.logical_and(mask, single_filter.get_selection())
-        return mask
+        # make sure selections changed without a callback (e.g. by setting a widget value) are included
+        for index, single_filter in enumerate(self.filters):
+            self.crossfilter.update_filter(index, single_filter.get_selection())
+        return self.crossfilter.get_selection()
 
     def register_callback(self, callback):
         """Register callback to every underlying filter"""
@@ -316,9 +539,7 @@ class DatasetFilterWithScatter(DatasetFilter):
         # use all categorical filters
         for index, gui_filter in enumerate(self.filters[:-1]):
             self.categorical_grid[index//self.n_cols, index%self.n_cols] = gui_filter.show()
-        # hook all control elements to the update functions
-        for single_filter in self.filters:
-            single_filter.register_callback(self.update_plots)
+        self.build_crossfilter(data_selection.shape[0])
         self.gui = pn.Column(self.categorical_grid, self.scatter_filter.show())
 
     def generate_filters(self, data_selection):
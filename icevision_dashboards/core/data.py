@@ -1,12 +1,25 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/core.data.ipynb (unless otherwise specified).
 
-__all__ = ['Observable', 'ObservableList', 'DatasetDescriptor', 'StringDescriptor', 'GenericDataset']
+__all__ = ['Observable', 'ListChange', 'ObservableList', 'Crossfilter', 'DatasetDescriptor', 'StringDescriptor',
+           'GenericDataset', 'get_file_metadata', 'collect_file_metadata', 'get_files_fingerprint', 'ThumbnailStore',
+           'write_array_file', 'read_array_file']
 
 # Cell
-from typing import Union, Optional, Any, Iterable, Callable
+from typing import Union, Optional, Any, Iterable, Callable, List
 import os
 import shutil
+import datetime
+import hashlib
+import pickle
+import threading
+import json
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from PIL import Image
 
 # Cell
 class Observable(ABC):
@@ -21,21 +34,82 @@ class Observable(ABC):
         for callback in self._callbacks:
             callback(self)
 
+# Cell
+class ListChange:
+    """Describes the change of an `ObservableList`. `origins` has an entry for every item of the list after the change, the index
+    of the item in the list before the change or None if the item was added. `removed` are the indices of the removed items
+    in the list before the change and `added` the indices of the added items in the list after the change."""
+    def __init__(self, origins: List[Optional[int]], old_length: int):
+        self.origins = origins
+        self.old_length = old_length
+        kept = set(origin for origin in origins if origin is not None)
+        self.removed = [index for index in range(old_length) if index not in kept]
+        self.added = [index for index, origin in enumerate(origins) if origin is None]
+
+    def __repr__(self):
+        return f"ListChange(removed={self.removed}, added={self.added})"
+
+    @property
+    def has_changes(self) -> bool:
+        return self.origins != list(range(self.old_length))
+
+    @property
+    def is_reordered(self) -> bool:
+        """True if the remaining items changed their order."""
+        kept = [origin for origin in self.origins if origin is not None]
+        return any(previous > following for previous, following in zip(kept, kept[1:]))
+
+    @property
+    def is_append(self) -> bool:
+        """True if items were only appended to the end of the list."""
+        return self.origins[:self.old_length] == list(range(self.old_length))
+
 # Cell
 class ObservableList(Observable):
-    """List with observer pattern. The internal list prepresentation can be accessed with the list attribute"""
+    """List with observer pattern. The internal list prepresentation can be accessed with the list attribute.
+    All changes made inside of `with observable_list.batch():` trigger the callbacks only once at the end of the block. Before the callbacks
+    are triggered the combined change is stored as `ListChange` in the `last_change` attribute."""
     def __init__(self, observable_list: list):
         self._list = observable_list
+        # index of each item in the list at the start of the batch, None for added items
+        self._origins = None
+        self._batch_length = 0
+        self._batch_depth = 0
+        self.last_change = None
         super().__init__()
 
+    @contextmanager
+    def batch(self):
+        if self._batch_depth == 0:
+            self._origins = list(range(len(self._list)))
+            self._batch_length = len(self._list)
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                change = ListChange(self._origins, self._batch_length)
+                self._origins = None
+                if change.has_changes:
+                    self.last_change = change
+                    self.trigger_callbacks()
+
     @property
     def list(self):
         return self._list
 
     @list.setter
     def list(self, value: Any):
-        self._list = value
-        self.trigger_callbacks()
+        with self.batch():
+            # items that are kept at the start of the list (e.g. a list with appended items) are not counted as changed
+            num_kept = 0
+            for item, new_item in zip(self._list, value):
+                if item is not new_item:
+                    break
+                num_kept += 1
+            self._origins = self._origins[:num_kept] + [None]*(len(value) - num_kept)
+            self._list = value
 
     def __repr__(self):
         return self._list.__repr__()
@@ -50,62 +124,142 @@ class ObservableList(Observable):
     def __getitem__(self, index: int):
         return self._list[index]
 
-    def __setitem__(self, index: int, value: Any):
-        self._list[index] = value
-        self.trigger_callbacks()
+    def __setitem__(self, index: Union[int, slice], value: Any):
+        with self.batch():
+            if isinstance(index, slice):
+                value = list(value)
+                self._list[index] = value
+                self._origins[index] = [None]*len(value)
+            else:
+                self._list[index] = value
+                self._origins[index] = None
 
     def append(self, item: Any):
-        self._list.append(item)
-        self.trigger_callbacks()
+        with self.batch():
+            self._list.append(item)
+            self._origins.append(None)
 
     def remove(self, item: Any):
-        self._list.remove(item)
-        self.trigger_callbacks()
+        self.pop(self._list.index(item))
 
     def insert(self, index: int, item: Any):
-        self._list.insert(index, item)
-        self.trigger_callbacks()
+        with self.batch():
+            self._list.insert(index, item)
+            self._origins.insert(index, None)
 
     def pop(self, index: int = -1):
-        poped_item = self._list.pop(index)
-        self.trigger_callbacks()
+        with self.batch():
+            poped_item = self._list.pop(index)
+            self._origins.pop(index)
         return poped_item
 
     def extend(self, iterable: Iterable):
-        self._list.extend(iterable)
-        self.trigger_callbacks()
+        items = list(iterable)
+        with self.batch():
+            self._list.extend(items)
+            self._origins.extend([None]*len(items))
+
+    def delete_indices(self, indices: Iterable[int]):
+        """Removes the items at the `indices` with a single change."""
+        indices = set(index if index >= 0 else len(self._list) + index for index in indices)
+        with self.batch():
+            self._list[:] = [item for index, item in enumerate(self._list) if index not in indices]
+            self._origins = [origin for index, origin in enumerate(self._origins) if index not in indices]
 
     def clear(self):
-        self._list = []
+        with self.batch():
+            self._list = []
+            self._origins = []
 
     def count(self, item):
         return self._list.count(item)
 
     def index(self, item, start=0, stop=9223372036854775807):
-        return self._list.index(item, start=start, stop=stop)
+        return self._list.index(item, start, stop)
 
     def reverse(self):
-        self._list.reverse()
+        with self.batch():
+            self._list.reverse()
+            self._origins.reverse()
+
+    def sort(self, key: Optional[Callable] = None, reverse: bool = False):
+        order = sorted(range(len(self._list)), key=(lambda index: self._list[index]) if key is None else (lambda index: key(self._list[index])), reverse=reverse)
+        with self.batch():
+            self._list[:] = [self._list[index] for index in order]
+            self._origins = [self._origins[index] for index in order]
 
-    def sort(self, key, reverse=False):
-        self._list.sort(key, reverse=reverse)
+# Cell
+class Crossfilter:
+    """Combines the selections (boolean masks) of multiple filters over the same rows, similar to crossfilter.js. Additionally to the mask of each filter
+    the number of filters that reject a row is stored, so a changed filter only updates the counts of the rows whose membership changed. The rows selected by
+    all filters except one (`get_selection(exclude=index)`) are used to show the data of a filter without its own predicate."""
+    def __init__(self, num_rows: int):
+        self.num_rows = num_rows
+        self.masks = []
+        self.reject_counts = np.zeros(num_rows, dtype=np.int32)
+
+    def add_filter(self, mask: Optional[np.ndarray] = None) -> int:
+        """Adds a filter that selects all rows and updates it with `mask` if given. Returns the index of the filter."""
+        self.masks.append(np.ones(self.num_rows, dtype=bool))
+        if mask is not None:
+            self.update_filter(len(self.masks)-1, mask)
+        return len(self.masks)-1
+
+    def update_filter(self, index: int, mask: np.ndarray) -> np.ndarray:
+        """Replaces the mask of filter `index`, only the reject counts of the changed rows are updated. Returns the indices of the changed rows."""
+        mask = np.asarray(mask, dtype=bool)
+        changed_rows = np.flatnonzero(mask != self.masks[index])
+        # newly rejected rows are counted up, newly selected rows down
+        self.reject_counts[changed_rows] += np.where(mask[changed_rows], -1, 1).astype(self.reject_counts.dtype)
+        self.masks[index] = mask
+        return changed_rows
+
+    def get_selection(self, exclude: Optional[int] = None) -> np.ndarray:
+        """Returns the rows selected by all filters, without the filter `exclude` if given."""
+        if exclude is None:
+            return self.reject_counts == 0
+        # rejected by no filter or only by the excluded one
+        return self.reject_counts == ~self.masks[exclude]
+
+    def get_affected_filters(self, changed_filter: int, changed_rows: np.ndarray) -> List[int]:
+        """Returns the indices of the filters whose selection without their own predicate changed with the `changed_rows` of `changed_filter`.
+        That is the case if one of the changed rows is selected by all other filters."""
+        reject_counts = self.reject_counts[changed_rows] - ~self.masks[changed_filter][changed_rows]
+        return [
+            index for index, mask in enumerate(self.masks)
+            if index != changed_filter and np.any(reject_counts == ~mask[changed_rows])
+        ]
 
 # Cell
 class DatasetDescriptor(ABC):
-    """Abstract base class for descriptors of datasets"""
+    """Abstract base class for descriptors of datasets. If the dataset has a `cache_dir` the descriptions are stored there and loaded
+    instead of calculated again, the entries are keyed by the fingerprint of the dataset and the parameters of the descriptor (`get_cache_params`).
+    `dependencies` are the names of the dataset attributes (other descriptors, `base_data`, `name`, ...) the description is calculated from.
+    Descriptors can keep additional state for `update_description` in the dataset attribute `<private_name>_state`, it is removed together with the description.
+    Descriptors that read the metadata of files (e.g. modification dates) set `reads_file_metadata`, the fingerprint of their datasets then includes the metadata
+    of the files of the dataset (see `GenericDataset.get_filepaths`), so changed files don't load outdated descriptions from the cache."""
+    cacheable = True
+    reads_file_metadata = False
+    dependencies = ["base_data"]
+
     def __set_name__(self, owner, name):
+        # every dataset class has its own list of descriptors, including the ones of its parent classes
+        if "_descriptors" not in owner.__dict__:
+            owner._descriptors = list(owner._descriptors)
         owner._descriptors.append(self)
+        self.attribute_name = name
         self.private_name = '_' + name
 
     def __get__(self, obj, objtype=None):
         if getattr(obj, self.private_name) is None:
-            value = self.calculate_description(obj)
+            value = self.load_or_calculate_description(obj)
             setattr(obj, self.private_name, value)
         return getattr(obj, self.private_name)
 
     def __set__(self, obj, value):
         if value is None:
             setattr(obj, self.private_name, value)
+            obj.__dict__.pop(self.private_name + "_state", None)
         else:
             raise ValueError("Attribute can externaly only be set to None")
 
@@ -113,10 +267,44 @@ class DatasetDescriptor(ABC):
     def calculate_description(self, obj):
         pass
 
+    def update_description(self, obj, value, changes: dict):
+        """Updates the current description `value` with the `changes` of its dependencies (see `GenericDataset.invalidate`).
+        Returns None if the description can't be updated and needs to be calculated again."""
+        return None
+
+    def get_cache_params(self, obj) -> dict:
+        """Parameters that change the description besides the data of the dataset (e.g. ious of a metric), used for the cache key."""
+        return {}
+
+    def get_cache_path(self, obj) -> str:
+        cache_key = (type(obj).__qualname__, type(self).__module__, type(self).__qualname__, self.private_name, obj.get_fingerprint(), self.get_cache_params(obj))
+        return os.path.join(obj.cache_dir, hashlib.sha1(pickle.dumps(cache_key)).hexdigest() + ".pkl")
+
+    def load_or_calculate_description(self, obj):
+        if getattr(obj, "cache_dir", None) is None or not self.cacheable:
+            return self.calculate_description(obj)
+        cache_path = self.get_cache_path(obj)
+        if os.path.isfile(cache_path):
+            try:
+                with open(cache_path, "rb") as cache_file:
+                    return pickle.load(cache_file)
+            except (EOFError, pickle.UnpicklingError):
+                # broken entries are calculated again and overwritten
+                pass
+        value = self.calculate_description(obj)
+        os.makedirs(obj.cache_dir, exist_ok=True)
+        # write to a temporary file first, so other processes never read a partial entry
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as cache_file:
+            pickle.dump(value, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        return value
+
 # Cell
 class StringDescriptor:
-    """Descriptor for strings"""
+    """Descriptor for strings, setting the string invalidates the dataset descriptors that depend on it (see `GenericDataset.invalidate`)."""
     def __set_name__(self, owner, name):
+        self.attribute_name = name
         self.private_name = '_' + name
 
     def __get__(self, obj, objtype=None):
@@ -124,11 +312,15 @@ class StringDescriptor:
 
     def __set__(self, obj, value):
         setattr(obj, self.private_name, value)
+        if hasattr(obj, "invalidate"):
+            obj.invalidate([self.attribute_name])
 
 # Cell
 class GenericDataset:
-    """A generic datset that has a name and description. Data is stored under the attribute base_data. The class provides a function `reset_infered_data` which can be called to reset all descriptors."""
+    """A generic datset that has a name and description. Data is stored under the attribute base_data. The class provides a function `reset_infered_data` which can be called to reset all descriptors.
+    Setting `cache_dir` (on the class or an instance) enables the persistent cache of the descriptors."""
     _descriptors = []
+    cache_dir = None
 
     name = StringDescriptor()
     description = StringDescriptor()
@@ -137,9 +329,248 @@ class GenericDataset:
         self.base_data = base_data
         self.name = name
         self.description = description
+        self._fingerprint = None
         super().__init__()
 
     def reset_infered_data(self, new_data=None):
         """Takes on argument to be compatible with panel."""
+        self._fingerprint = None
         for descriptor in self._descriptors:
-            descriptor.__set__(self, None)
\ No newline at end of file
+            descriptor.__set__(self, None)
+
+    @classmethod
+    def get_sorted_descriptors(cls) -> list:
+        """Returns the descriptors of the class sorted such that each descriptor comes after its dependencies."""
+        descriptors = {descriptor.attribute_name: descriptor for descriptor in cls._descriptors}
+        sorted_descriptors, visited = [], set()
+        def visit(descriptor):
+            if descriptor.attribute_name in visited:
+                return
+            visited.add(descriptor.attribute_name)
+            for dependency in descriptor.dependencies:
+                if dependency in descriptors:
+                    visit(descriptors[dependency])
+            sorted_descriptors.append(descriptor)
+        for descriptor in cls._descriptors:
+            visit(descriptor)
+        return sorted_descriptors
+
+    def invalidate(self, names: List[str], changes: Optional[dict] = None):
+        """Marks the descriptors that depend directly or indirectly on the attributes `names` as outdated, they are calculated again on the next access.
+        If `changes` (a dict with the changes of attributes, e.g. the appended records for `base_data`) is given, already calculated descriptors are updated
+        with `update_description` where possible. Updated descriptors can add their own changes to the dict for the descriptors that depend on them."""
+        if "base_data" in names:
+            self._fingerprint = None
+        changes = dict(changes) if changes is not None else {}
+        outdated = set(names)
+        for descriptor in self.get_sorted_descriptors():
+            if outdated.isdisjoint(descriptor.dependencies):
+                continue
+            outdated.add(descriptor.attribute_name)
+            value = getattr(self, descriptor.private_name, None)
+            updated_value = descriptor.update_description(self, value, changes) if value is not None else None
+            if updated_value is None:
+                descriptor.__set__(self, None)
+            else:
+                setattr(self, descriptor.private_name, updated_value)
+
+    def get_fingerprint(self) -> str:
+        """Content fingerprint of the dataset used as key for the descriptor cache, it is calculated once until `reset_infered_data` is called.
+        If a descriptor of the dataset reads file metadata, the fingerprint includes the size and modification time of the files (see `get_files_fingerprint`)."""
+        if getattr(self, "_fingerprint", None) is None:
+            fingerprint = self.calculate_fingerprint()
+            if any(descriptor.reads_file_metadata for descriptor in self._descriptors):
+                fingerprint = hashlib.sha1((fingerprint + get_files_fingerprint(self.get_filepaths())).encode()).hexdigest()
+            self._fingerprint = fingerprint
+        return self._fingerprint
+
+    def get_filepaths(self) -> List[str]:
+        """The files of the dataset whose metadata is read by the descriptors."""
+        return []
+
+    def calculate_fingerprint(self) -> str:
+        fingerprint = hashlib.sha1()
+        if isinstance(self.base_data, pd.DataFrame):
+            fingerprint.update(repr([(str(column), str(dtype)) for column, dtype in self.base_data.dtypes.items()]).encode())
+            try:
+                fingerprint.update(pd.util.hash_pandas_object(self.base_data).to_numpy().tobytes())
+                return fingerprint.hexdigest()
+            except TypeError:
+                # columns with unhashable values
+                pass
+        fingerprint.update(pickle.dumps(self.base_data, protocol=pickle.HIGHEST_PROTOCOL))
+        return fingerprint.hexdigest()
+
+# Cell
+def get_file_metadata(filepath, read_image_size: bool = False) -> dict:
+    """Returns the creation and modification date of a file and, if `read_image_size` is True, the width and height of the image.
+    For the image size only the header of the image is read."""
+    file_stats = os.stat(filepath)
+    metadata = {"creation_date": datetime.datetime.fromtimestamp(file_stats.st_ctime), "modification_date": datetime.datetime.fromtimestamp(file_stats.st_mtime)}
+    if read_image_size:
+        with Image.open(filepath) as img:
+            metadata["width"], metadata["height"] = img.size
+    return metadata
+
+# Cell
+def collect_file_metadata(filepaths: Iterable, read_image_size: bool = False, num_workers: Optional[int] = None, progress_callback: Optional[Callable] = None) -> list:
+    """Collects `get_file_metadata` for all filepaths with a thread pool of `num_workers` threads (the default of `ThreadPoolExecutor` if None, no pool if 0 or 1).
+    Each file is only accessed once, even if it occures multiple times. `progress_callback` is called with the number of processed files and the total number of files.
+    Returns the metadata in the order of `filepaths`."""
+    filepaths = list(filepaths)
+    unique_filepaths = list(dict.fromkeys(filepaths))
+    metadata = {}
+    if num_workers is not None and num_workers <= 1:
+        for num_done, filepath in enumerate(unique_filepaths, 1):
+            metadata[filepath] = get_file_metadata(filepath, read_image_size)
+            if progress_callback is not None:
+                progress_callback(num_done, len(unique_filepaths))
+    else:
+        with ThreadPoolExecutor(num_workers) as executor:
+            futures = {executor.submit(get_file_metadata, filepath, read_image_size): filepath for filepath in unique_filepaths}
+            for num_done, future in enumerate(as_completed(futures), 1):
+                metadata[futures[future]] = future.result()
+                if progress_callback is not None:
+                    progress_callback(num_done, len(unique_filepaths))
+    return [metadata[filepath] for filepath in filepaths]
+
+# Cell
+def get_files_fingerprint(filepaths: Iterable) -> str:
+    """Fingerprint of the size and the modification and change times of the files, missing files are included as missing."""
+    fingerprint = hashlib.sha1()
+    for filepath in dict.fromkeys(str(filepath) for filepath in filepaths):
+        try:
+            file_stats = os.stat(filepath)
+            fingerprint.update(repr((filepath, file_stats.st_size, file_stats.st_mtime_ns, file_stats.st_ctime_ns)).encode())
+        except OSError:
+            fingerprint.update(repr((filepath, None)).encode())
+    return fingerprint.hexdigest()
+
+# Cell
+class ThumbnailStore:
+    """On disk store of downscaled copies of images, used to show many images at once. The thumbnails are created lazily with a thread pool
+    of `num_workers` threads and saved as JPEG files in `path`. The name of a thumbnail is a hash of the absolute filepath, the modification time
+    and size of the image and the thumbnail size, so a store can be reused across sessions and changed images get a new thumbnail."""
+    def __init__(self, path: str, size: tuple = (128, 128), num_workers: Optional[int] = None, quality: int = 85):
+        self.path = path
+        self.size = tuple(size)
+        self.num_workers = num_workers
+        self.quality = quality
+        os.makedirs(path, exist_ok=True)
+
+    def get_thumbnail_path(self, filepath) -> str:
+        file_stats = os.stat(filepath)
+        key = hashlib.sha1(repr((os.path.abspath(filepath), file_stats.st_mtime_ns, file_stats.st_size, self.size)).encode()).hexdigest()
+        return os.path.join(self.path, key[:2], key + ".jpg")
+
+    def create_thumbnail(self, filepath) -> str:
+        """Returns the path of the thumbnail of the image, the thumbnail is only created if it doesn't exist."""
+        thumbnail_path = self.get_thumbnail_path(filepath)
+        if os.path.isfile(thumbnail_path):
+            return thumbnail_path
+        with Image.open(filepath) as img:
+            # lets the decoder skip the full resolution for JPEGs
+            img.draft("RGB", self.size)
+            img = img.convert("RGB")
+            img.thumbnail(self.size)
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+            # write to a temporary file first, so other threads or sessions never read a partially written thumbnail
+            tmp_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, "JPEG", quality=self.quality)
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail_path
+
+    def _try_create_thumbnail(self, filepath) -> Optional[str]:
+        try:
+            return self.create_thumbnail(filepath)
+        except OSError:
+            return None
+
+    def get_thumbnails(self, filepaths: Iterable, progress_callback: Optional[Callable] = None) -> List[Optional[str]]:
+        """Returns the thumbnail paths for all filepaths in the same order, missing thumbnails are created with the thread pool.
+        Images that can't be read get None as thumbnail path. `progress_callback` is called with the number of processed images and the total number of images."""
+        filepaths = [str(filepath) for filepath in filepaths]
+        unique_filepaths = list(dict.fromkeys(filepaths))
+        thumbnail_paths = {}
+        if self.num_workers is not None and self.num_workers <= 1:
+            for num_done, filepath in enumerate(unique_filepaths, 1):
+                thumbnail_paths[filepath] = self._try_create_thumbnail(filepath)
+                if progress_callback is not None:
+                    progress_callback(num_done, len(unique_filepaths))
+        else:
+            with ThreadPoolExecutor(self.num_workers) as executor:
+                futures = {executor.submit(self._try_create_thumbnail, filepath): filepath for filepath in unique_filepaths}
+                for num_done, future in enumerate(as_completed(futures), 1):
+                    thumbnail_paths[futures[future]] = future.result()
+                    if progress_callback is not None:
+                        progress_callback(num_done, len(unique_filepaths))
+        return [thumbnail_paths[filepath] for filepath in filepaths]
+
+    def clear(self):
+        """Deletes all thumbnails of the store."""
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path, exist_ok=True)
+
+# Cell
+_ARRAY_FILE_MAGIC = b"ICEDARR1"
+
+def write_array_file(path: str, arrays: dict, metadata: Optional[dict] = None, alignment: int = 64):
+    """Writes a dict of numpy arrays and json serializable `metadata` into a single binary file, that can be memory mapped with `read_array_file`.
+    The file starts with a json header that describes the arrays, the arrays follow as raw bytes aligned to `alignment` bytes.
+    Arrays of strings or objects are stored as utf-8 encoded strings, objects are converted with `str`."""
+    entries, blobs, data_length = {}, [], 0
+    def add_blob(array):
+        nonlocal data_length
+        array = np.ascontiguousarray(array)
+        offset = -(-data_length // alignment) * alignment
+        blobs.append((offset, array))
+        data_length = offset + array.nbytes
+        return {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        if array.dtype.kind in "OUS":
+            encoded = [str(value).encode() for value in array.ravel().tolist()]
+            entries[name] = {
+                "encoding": "utf-8", "shape": list(array.shape), "data": add_blob(np.frombuffer(b"".join(encoded), dtype=np.uint8)),
+                "offsets": add_blob(np.r_[0, np.cumsum([len(value) for value in encoded], dtype=np.int64)])
+            }
+        else:
+            entries[name] = add_blob(array)
+    header = json.dumps({"arrays": entries, "metadata": metadata if metadata is not None else {}, "alignment": alignment}).encode()
+    data_start = -(-(len(_ARRAY_FILE_MAGIC) + 8 + len(header)) // alignment) * alignment
+    # write to a temporary file first, so an existing file is only replaced by a complete one
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as array_file:
+        array_file.write(_ARRAY_FILE_MAGIC + len(header).to_bytes(8, "little") + header)
+        for offset, array in blobs:
+            array_file.seek(data_start + offset)
+            array_file.write(array.tobytes())
+        array_file.truncate(data_start + data_length)
+    os.replace(tmp_path, path)
+
+# Cell
+def read_array_file(path: str, mmap: bool = True):
+    """Reads the arrays and metadata of a file written with `write_array_file`. Returns a tuple of the dict of arrays and the metadata.
+    With `mmap` the numeric arrays are read-only views of the memory mapped file and are only loaded when they are accessed, string arrays are always decoded into object arrays."""
+    with open(path, "rb") as array_file:
+        if array_file.read(len(_ARRAY_FILE_MAGIC)) != _ARRAY_FILE_MAGIC:
+            raise ValueError(f"{path} is not an array file")
+        header_length = int.from_bytes(array_file.read(8), "little")
+        header = json.loads(array_file.read(header_length))
+    data_start = -(-(len(_ARRAY_FILE_MAGIC) + 8 + header_length) // header["alignment"]) * header["alignment"]
+    buffer = np.memmap(path, dtype=np.uint8, mode="r") if mmap else np.fromfile(path, dtype=np.uint8)
+
+    def get_blob(entry):
+        dtype = np.dtype(entry["dtype"])
+        start = data_start + entry["offset"]
+        return buffer[start:start + int(np.prod(entry["shape"], dtype=np.int64))*dtype.itemsize].view(dtype).reshape(entry["shape"])
+
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        if entry.get("encoding") == "utf-8":
+            data, offsets = get_blob(entry["data"]).tobytes(), get_blob(entry["offsets"]).tolist()
+            arrays[name] = np.array([data[start:end].decode() for start, end in zip(offsets[:-1], offsets[1:])], dtype=object).reshape(entry["shape"])
+        else:
+            arrays[name] = get_blob(entry)
+    return arrays, header["metadata"]
@@ -1,22 +1,22 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/data.ipynb (unless otherwise specified).
 
 __all__ = ['RecordDataframeParser', 'BboxRecordDataframeParser', 'MaskRecordDataframeParser', 'RecordDataset',
-           'DataDescriptorBbox', 'StatsDescriptorBbox', 'ImageStatsDescriptorBbox', 'ClassStatsDescriptorBbox',
-           'GalleryStatsDescriptorBbox', 'BboxRecordDataset', 'PrecisionRecallMetricsDescriptorObjectDetection',
-           'ObjectDetectionResultsDataset']
+           'BboxRecordColumns', 'DataDescriptorBbox', 'StatsDescriptorBbox', 'ImageStatsDescriptorBbox',
+           'ClassStatsDescriptorBbox', 'GalleryStatsDescriptorBbox', 'BboxRecordDataset',
+           'PrecisionRecallMetricsDescriptorObjectDetection', 'ImageIndexDescriptor', 'ObjectDetectionResultsDataset',
+           'ObjectDetectionResultsStore']
 
 # Cell
-import datetime
-from typing import Union, Optional, List
+from typing import Union, Optional, List, Callable
 import os
 import shutil
 import json
-from copy import deepcopy
+import hashlib
 import random
+from concurrent.futures import Executor
 
 import numpy as np
 import pandas as pd
-from PIL import Image
 import panel as pn
 
 from icevision.core.record import BaseRecord
@@ -34,38 +34,69 @@ from .core.data import *
 
 # Cell
 class RecordDataframeParser(parsers.Parser):
-    """IceVision parser for pandas datagrames. This parser is mostly used by the RecordDataset to load records from a saved RecordDataset."""
+    """IceVision parser for pandas datagrames. This parser is mostly used by the RecordDataset to load records from a saved RecordDataset.
+    The dataframe is sorted by filepath once, a sample is the slice of the rows of one image in the sorted columns (see `get_column`)."""
     def __init__(self, record_template):
         super().__init__(record_template)
+        self._order = None
+        self._image_offsets = None
+        self._columns = {}
+
+    def sort_by_filepath(self):
+        image_codes = pd.factorize(self.record_dataframe["filepath"], sort=True)[0]
+        self._order = np.argsort(image_codes, kind="stable")
+        self._image_offsets = np.r_[0, np.cumsum(np.bincount(image_codes))].astype(int)
+
+    @property
+    def image_offsets(self) -> np.ndarray:
+        """The rows of image `i` are `image_offsets[i]:image_offsets[i+1]` in the sorted columns."""
+        if self._image_offsets is None:
+            self.sort_by_filepath()
+        return self._image_offsets
+
+    def get_column(self, column: str) -> np.ndarray:
+        """Returns a column of the dataframe as numpy array sorted by filepath, each column is only converted once."""
+        if self._order is None:
+            self.sort_by_filepath()
+        if column not in self._columns:
+            self._columns[column] = self.record_dataframe[column].to_numpy()[self._order]
+        return self._columns[column]
 
     def __iter__(self):
-        for group in self.record_dataframe.groupby("filepath"):
-            yield group[1]
+        for start, end in zip(self.image_offsets[:-1], self.image_offsets[1:]):
+            yield slice(start, end)
 
     def __len__(self):
-        return self.record_dataframe["filepath"].nunique
+        return len(self.image_offsets) - 1
 
     def record_id(self, o):
-        return o.iloc[0]["id"]
+        return self.get_column("id")[o.start]
 
     def parse_fields(self, o, record, is_new):
-        width, height = o.iloc[0]["width"], o.iloc[0]["height"]
-        record.set_filepath(o.iloc[0]["filepath"])
+        width, height = self.get_column("width")[o.start], self.get_column("height")[o.start]
+        record.set_filepath(self.get_column("filepath")[o.start])
         record.set_img_size((width, height))
         record.detection.set_class_map(self.class_map)
-        record.detection.add_labels(o["label"])
+        record.detection.add_labels(self.get_column("label")[o].tolist())
 
 # Cell
 class BboxRecordDataframeParser(RecordDataframeParser):
     """Extends the RecordDataframeParser for object detection"""
+    BOX_COLUMNS = ["bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax"]
+
     def __init__(self, record_dataframe, class_map):
         super().__init__(ObjectDetectionRecord())
         self.record_dataframe = record_dataframe
         self.class_map = class_map
 
+    def create_record(self):
+        # same as the deepcopy of the empty template record, but faster
+        return ObjectDetectionRecord()
+
     def parse_fields(self, o, record, is_new):
         super().parse_fields(o, record, is_new)
-        record.detection.add_bboxes([BBox(annot[1]["bbox_xmin"], annot[1]["bbox_ymin"], annot[1]["bbox_xmax"], annot[1]["bbox_ymax"]) for annot in o.iterrows()])
+        boxes = np.stack([self.get_column(column)[o] for column in self.BOX_COLUMNS], axis=1).tolist()
+        record.detection.add_bboxes([BBox(*box) for box in boxes])
 
 # Cell
 class MaskRecordDataframeParser(RecordDataframeParser):
@@ -84,15 +115,27 @@ class MaskRecordDataframeParser(RecordDataframeParser):
 # Cell
 class RecordDataset(GenericDataset):
     """Base class dashboard datasets that are based on IceVision records."""
+    BINARY_EXTENSION = ".bin"
+
     def __init__(self, records: Union[List[BaseRecord], ObservableList, str], class_map, name=None, description=None):
         if isinstance(records, str):
             self.load_from_file(records)
+            name = self._name if name is None else name
+            description = self._description if description is None else description
         else:
-            self.records = records if isinstance(records, ObservableList) else ObservableList(records)
+            self.records = records if isinstance(records, Observable) else ObservableList(records)
             self.class_map = class_map
         super().__init__(self.records, name=name, description=description)
         self.records.register_callback(self.reset_infered_data)
 
+    def reset_infered_data(self, new_data=None):
+        """Called when the records change. If records were only appended (see `ObservableList.last_change`), the descriptors are updated with the new records where possible."""
+        change = getattr(new_data, "last_change", None)
+        if new_data is self.records and change is not None and change.is_append:
+            self.invalidate(["base_data"], {"base_data": [self.records[index] for index in change.added]})
+        else:
+            super().reset_infered_data(new_data)
+
     def __repr__(self):
         base_string = ""
         for col in self.stats_dataset.columns:
@@ -106,6 +149,18 @@ class RecordDataset(GenericDataset):
     def __len__(self):
         return len(self.records)
 
+    def calculate_fingerprint(self):
+        """The fingerprint is calculated from the class map and the annotations of the records."""
+        fingerprint = hashlib.sha1(repr(self.class_map._id2class if self.class_map is not None else None).encode())
+        for record in self.records:
+            fingerprint.update(repr((
+                str(record.filepath), record.record_id, record.width, record.height, record.detection.label_ids, [bbox.xyxy for bbox in record.detection.bboxes]
+            )).encode())
+        return fingerprint.hexdigest()
+
+    def get_filepaths(self):
+        return [str(record.filepath) for record in self.records]
+
     def split_in_train_and_val(self, train_fraction):
         records = list(self.records)
         if train_fraction > 1:
@@ -136,6 +191,10 @@ class RecordDataset(GenericDataset):
         raise NotImplementedError()
 
     def load_from_file(self, path):
+        """Loads a dataset saved with `save`, files with the `BINARY_EXTENSION` are loaded with `load_from_binary_file`."""
+        if path.endswith(self.BINARY_EXTENSION):
+            self.load_from_binary_file(path)
+            return
         data = json.load(open(path))
         df = pd.DataFrame(data["data"])
         self.class_map = ClassMap(data["class_map"])
@@ -144,20 +203,25 @@ class RecordDataset(GenericDataset):
         records = self.parse_df_to_records(df, self.class_map)
         self.records = ObservableList(records)
 
-    def save(self, save_path):
+    def load_from_binary_file(self, path):
+        raise NotImplementedError()
+
+    def save_binary(self, path):
+        raise NotImplementedError()
+
+    def save(self, save_path, binary: bool = False):
+        """Saves the dataset as json file into the folder `save_path`, with `binary` the dataset is saved with `save_binary` which is faster to save and load."""
         if not os.path.isdir(save_path):
             os.makedirs(save_path, exist_ok=True)
-        save_name = "dataset" if self.name == "" or self.name is None else self.name
-        if not os.path.isfile(os.path.join(save_path, save_name+".json")):
-            save_name = save_name+".json"
-        else:
-            counter = 1
-            while True:
-                save_name = save_name+"("+str(counter)+").json"
-                if os.path.isfile(os.path.join(save_path, save_name)):
-                    counter += 1
-                else:
-                    break
+        extension = self.BINARY_EXTENSION if binary else ".json"
+        base_name = "dataset" if self.name == "" or self.name is None else self.name
+        save_name, counter = base_name + extension, 1
+        while os.path.isfile(os.path.join(save_path, save_name)):
+            save_name = f"{base_name}({counter}){extension}"
+            counter += 1
+        if binary:
+            self.save_binary(os.path.join(save_path, save_name))
+            return
 
         class_map = self.class_map if self.class_map is not None else self.create_class_map_from_record_df(self.data)
         save_data = {"name": self.name, "description": self.description, "data": self.data.to_dict(), "class_map": class_map._id2class}
@@ -174,39 +238,179 @@ class RecordDataset(GenericDataset):
         new_records = [record for record in cls_instance.records if str(record.filepath) in filepaths]
         return cls(new_records, cls_instance.class_map)
 
+# Cell
+class BboxRecordColumns(Observable):
+    """Compact storage of object detection records as numpy arrays, that can be used instead of a list of records in the `BboxRecordDataset`.
+    The values of the images are stored in one array each (`record_ids`, `filepaths`, `widths`, `heights`) and the boxes of all images in `boxes` (shape (N, 4), xyxy)
+    and `label_ids`, the boxes of image `i` are the rows `box_offsets[i]:box_offsets[i+1]`. IceVision records are only created on access (`__getitem__`).
+    The columns can't be changed, so the registered callbacks are never triggered."""
+    def __init__(self, record_ids: np.ndarray, filepaths: np.ndarray, widths: np.ndarray, heights: np.ndarray, box_offsets: np.ndarray, boxes: np.ndarray, label_ids: np.ndarray, class_map=None):
+        self.record_ids = record_ids
+        self.filepaths = filepaths
+        self.widths = widths
+        self.heights = heights
+        self.box_offsets = box_offsets
+        self.boxes = boxes
+        self.label_ids = label_ids
+        self.class_map = class_map
+        super().__init__()
+
+    @classmethod
+    def from_records(cls, records: List[BaseRecord], class_map=None):
+        record_ids, filepaths, widths, heights, num_boxes, boxes, label_ids = [], [], [], [], [], [], []
+        for record in records:
+            record_ids.append(record.record_id)
+            filepaths.append(str(record.filepath))
+            widths.append(record.width)
+            heights.append(record.height)
+            num_boxes.append(len(record.detection.bboxes))
+            boxes.extend(bbox.xyxy for bbox in record.detection.bboxes)
+            label_ids.extend(record.detection.label_ids)
+        return cls(
+            np.array(record_ids, dtype=object), np.array(filepaths, dtype=object), np.array(widths), np.array(heights),
+            np.r_[0, np.cumsum(num_boxes, dtype=int)], np.array(boxes).reshape(-1, 4), np.array(label_ids, dtype=int), class_map
+        )
+
+    @classmethod
+    def from_record_dataframe(cls, record_data_df: pd.DataFrame, class_map=None):
+        """Creates the columns from a dataframe with one row per box (e.g. `BboxRecordDataset.data`) without creating records. The images are sorted by filepath.
+        If a `class_map` is given the label ids are taken from the class map, otherwise from the `label_num` column."""
+        image_codes, filepaths = pd.factorize(record_data_df["filepath"], sort=True)
+        order = np.argsort(image_codes, kind="stable")
+        box_offsets = np.r_[0, np.cumsum(np.bincount(image_codes, minlength=len(filepaths)))]
+        first_rows = order[box_offsets[:-1]]
+        if class_map is not None:
+            label_ids = record_data_df["label"].map({label: class_map.get_by_name(label) for label in record_data_df["label"].unique()}).to_numpy(dtype=int)
+        else:
+            label_ids = record_data_df["label_num"].to_numpy(dtype=int)
+        return cls(
+            record_data_df["id"].to_numpy(dtype=object)[first_rows], np.asarray(filepaths, dtype=object), record_data_df["width"].to_numpy()[first_rows],
+            record_data_df["height"].to_numpy()[first_rows], box_offsets, record_data_df[["bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax"]].to_numpy()[order],
+            label_ids[order], class_map
+        )
+
+    @property
+    def num_boxes(self) -> np.ndarray:
+        """Number of boxes of each image."""
+        return np.diff(self.box_offsets)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays, without the strings of the object arrays."""
+        return sum(array.nbytes for array in [self.record_ids, self.filepaths, self.widths, self.heights, self.box_offsets, self.boxes, self.label_ids])
+
+    def __len__(self):
+        return len(self.record_ids)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.get_record(index)
+
+    def __getitem__(self, index: Union[int, slice, np.ndarray, List[int]]):
+        """Integer indices return a record, slices, masks and index lists return the selected images as new `BboxRecordColumns`."""
+        if isinstance(index, (int, np.integer)):
+            return self.get_record(index)
+        return self.take(np.arange(len(self))[index])
+
+    def __repr__(self):
+        return f"<BboxRecordColumns: {len(self)} images, {len(self.boxes)} boxes>"
+
+    def get_record(self, index: int) -> BaseRecord:
+        index = range(len(self))[index]
+        start, end = self.box_offsets[index], self.box_offsets[index+1]
+        record = ObjectDetectionRecord()
+        record.set_record_id(self.record_ids[index])
+        record.set_filepath(self.filepaths[index])
+        record.set_img_size((int(self.widths[index]), int(self.heights[index])))
+        record.detection.set_class_map(self.class_map)
+        record.detection.add_labels_by_id(self.label_ids[start:end].tolist())
+        record.detection.add_bboxes([BBox.from_xyxy(*box) for box in self.boxes[start:end].tolist()])
+        return record
+
+    def filter_boxes(self, mask: np.ndarray):
+        """Returns new `BboxRecordColumns` with the same images but only the boxes selected by the boolean `mask`."""
+        mask = np.asarray(mask, dtype=bool)
+        box_offsets = np.r_[0, np.cumsum(mask, dtype=int)][self.box_offsets]
+        return type(self)(self.record_ids, self.filepaths, self.widths, self.heights, box_offsets, self.boxes[mask], self.label_ids[mask], self.class_map)
+
+    def take(self, indices: np.ndarray):
+        """Returns the images at `indices` as new `BboxRecordColumns`."""
+        indices = np.asarray(indices, dtype=int)
+        num_boxes = self.num_boxes[indices]
+        box_offsets = np.r_[0, np.cumsum(num_boxes, dtype=int)]
+        # index of each selected box in the boxes of all images
+        box_rows = np.repeat(self.box_offsets[indices] - box_offsets[:-1], num_boxes) + np.arange(box_offsets[-1])
+        return type(self)(
+            self.record_ids[indices], self.filepaths[indices], self.widths[indices], self.heights[indices],
+            box_offsets, self.boxes[box_rows], self.label_ids[box_rows], self.class_map
+        )
+
 # Cell
 class DataDescriptorBbox(DatasetDescriptor):
-    """Dashboard dataset for object detection"""
+    """Dashboard dataset for object detection. The file dates are collected with `collect_file_metadata` using `num_workers` threads and the `progress_callback`."""
+    reads_file_metadata = True
+
+    def __init__(self, num_workers: Optional[int] = None, progress_callback: Optional[Callable] = None):
+        self.num_workers = num_workers
+        self.progress_callback = progress_callback
+
     def calculate_description(self, obj):
         """Aggregates stats from a list of records and returns a pandas dataframe with the aggregated stats. The creation time is not necessarily the real creation time.
-        This depends on the OS, for more information see: https://docs.python.org/3/library/os.html#os.stat_result."""
-        data = []
-        for index,record in enumerate(obj.records):
-            record_commons, record_detections = record.as_dict()["common"], record.aggregate_objects()["detection"]
-            for label, bbox in zip(record_detections["labels"], record_detections["bboxes"]):
-                file_stats = record.filepath.stat()
-                bbox_width = bbox["bbox_width"]
-                bbox_height = bbox["bbox_height"]
-                area = bbox_width*bbox_height
-                area_normalized = area / (record.width * record.height)
-                bbox_ratio = bbox_width / bbox_height
-                data.append(
-                    {
-                        "id": record_commons["record_id"], "width": record.width, "height": record.height, "label": label, "area_square_root": bbox["bbox_sqrt_area"], "area_square_root_normalized": area_normalized**0.5,
-                        "bbox_xmin": bbox["bbox_x"], "bbox_xmax": bbox["bbox_x"]+bbox["bbox_width"], "bbox_ymin": bbox["bbox_y"], "bbox_ymax": bbox["bbox_y"]+bbox["bbox_height"], "area": area,
-                        "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": index, "bbox_width": bbox_width,
-                        "bbox_height": bbox_height, "filepath": str(record.filepath), "creation_date": datetime.datetime.fromtimestamp(file_stats.st_ctime),
-                        "modification_date": datetime.datetime.fromtimestamp(file_stats.st_mtime), "num_annotations": len(record_detections["bboxes"])
-                    }
-                )
-        data = pd.DataFrame(data)
+        This depends on the OS, for more information see: https://docs.python.org/3/library/os.html#os.stat_result.
+        The boxes are collected into arrays per record and all derived columns are calculated at once, each image file is only accessed once."""
+        return self.get_record_rows(obj.records, obj.class_map)
+
+    def update_description(self, obj, value, changes):
+        """Appended records (`changes["base_data"]`) are added to the dataframe, the new rows are passed on as `changes["data"]`."""
+        if "base_data" not in changes:
+            return None
+        new_rows = self.get_record_rows(changes["base_data"], obj.class_map, start_index=len(obj.records)-len(changes["base_data"]))
+        changes["data"] = new_rows
+        return pd.concat([value, new_rows], ignore_index=True)
+
+    def get_record_rows(self, records: Union[List[BaseRecord], BboxRecordColumns], class_map, start_index=0):
+        """Creates the rows of the `records`, lists of records are converted to `BboxRecordColumns` first. Images without boxes have no rows."""
+        columns = records if isinstance(records, BboxRecordColumns) else BboxRecordColumns.from_records(records, class_map)
+        num_annotations = columns.num_boxes
+        has_boxes = num_annotations > 0
+        record_columns = {
+            "id": columns.record_ids[has_boxes], "width": columns.widths[has_boxes], "height": columns.heights[has_boxes],
+            "filepath": columns.filepaths[has_boxes], "num_annotations": num_annotations[has_boxes]
+        }
+        file_metadata = collect_file_metadata(record_columns["filepath"].tolist(), num_workers=self.num_workers, progress_callback=self.progress_callback)
+        record_columns["creation_date"] = np.array([metadata["creation_date"] for metadata in file_metadata], dtype=object)
+        record_columns["modification_date"] = np.array([metadata["modification_date"] for metadata in file_metadata], dtype=object)
+        # repeat the record values for each of its boxes
+        num_annotations = record_columns["num_annotations"]
+        record_columns = {key: np.repeat(values, num_annotations) for key, values in record_columns.items()}
+        record_index = np.repeat(np.flatnonzero(has_boxes) + start_index, num_annotations)
+
+        bbox_xmin, bbox_ymin, bbox_xmax, bbox_ymax = columns.boxes.T
+        bbox_width = bbox_xmax - bbox_xmin
+        bbox_height = bbox_ymax - bbox_ymin
+        area = bbox_width*bbox_height
+        with np.errstate(divide="ignore", invalid="ignore"):
+            area_normalized = area / (record_columns["width"] * record_columns["height"])
+            bbox_ratio = bbox_width / bbox_height
+        data = pd.DataFrame({
+            "id": record_columns["id"], "width": record_columns["width"], "height": record_columns["height"], "label": columns.label_ids.astype(object), "area_square_root": area**0.5, "area_square_root_normalized": area_normalized**0.5,
+            "bbox_xmin": bbox_xmin, "bbox_xmax": bbox_xmax, "bbox_ymin": bbox_ymin, "bbox_ymax": bbox_ymax, "area": area,
+            "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": record_index, "bbox_width": bbox_width,
+            "bbox_height": bbox_height, "filepath": record_columns["filepath"], "creation_date": record_columns["creation_date"],
+            "modification_date": record_columns["modification_date"], "num_annotations": record_columns["num_annotations"]
+        }).infer_objects()
         data["label_num"] = data["label"]
-        if obj.class_map is not None:
-            data["label"] = data["label"].apply(obj.class_map.get_by_id)
+        if class_map is not None:
+            data["label"] = data["label"].map({label_id: class_map.get_by_id(label_id) for label_id in data["label"].unique()})
         return data
 
 # Cell
 class StatsDescriptorBbox(DatasetDescriptor):
+    dependencies = ["data", "name", "description"]
+
+    def get_cache_params(self, obj):
+        return {"name": obj._name, "description": obj._description}
+
     def calculate_description(self, obj):
         stats_dict = {}
         stats_dict["no_imgs"] = [obj.data["filepath"].nunique()]
@@ -222,6 +426,8 @@ class StatsDescriptorBbox(DatasetDescriptor):
 
 # Cell
 class ImageStatsDescriptorBbox(DatasetDescriptor):
+    dependencies = ["data"]
+
     def calculate_description(self, obj):
         """Creates a dataframe containing stats about the images."""
         stats_dict = {}
@@ -234,16 +440,32 @@ class ImageStatsDescriptorBbox(DatasetDescriptor):
 
 # Cell
 class ClassStatsDescriptorBbox(DatasetDescriptor):
+    """The number of objects per class and image is kept as state, so the stats can be updated with the new rows of `data`."""
+    dependencies = ["data"]
+
     def calculate_description(self, obj):
         """Creates a dataframe containing stats about the object classes."""
+        object_counts = obj.data.groupby(["label", "filepath"]).size()
+        setattr(obj, self.private_name + "_state", object_counts)
+        return self.get_class_stats(object_counts, obj.data.shape[0])
+
+    def update_description(self, obj, value, changes):
+        object_counts = getattr(obj, self.private_name + "_state", None)
+        if "data" not in changes or object_counts is None:
+            return None
+        object_counts = object_counts.add(changes["data"].groupby(["label", "filepath"]).size(), fill_value=0).astype(int)
+        setattr(obj, self.private_name + "_state", object_counts)
+        return self.get_class_stats(object_counts, obj.data.shape[0])
+
+    @staticmethod
+    def get_class_stats(object_counts, num_objects):
         stats_dict = {}
-        label_group = obj.data.groupby("label")
-        for label, group in label_group:
+        for label, label_object_counts in object_counts.groupby(level="label"):
             label_stats = {}
-            label_stats["imgs"] = group["filepath"].nunique()
-            label_stats["objects"] = group.shape[0]
+            label_stats["imgs"] = len(label_object_counts)
+            label_stats["objects"] = label_object_counts.sum()
             label_stats["avg_objects_per_img"] = label_stats["objects"]/label_stats["imgs"]
-            label_stats["frac_of_labels"] = round(label_stats["objects"]/obj.data.shape[0], 2)
+            label_stats["frac_of_labels"] = round(label_stats["objects"]/num_objects, 2)
             stats_dict[label] = label_stats
         df = pd.DataFrame(stats_dict).T
         df = df.rename_axis('Class').reset_index()
@@ -251,6 +473,8 @@ class ClassStatsDescriptorBbox(DatasetDescriptor):
 
 # Cell
 class GalleryStatsDescriptorBbox(DatasetDescriptor):
+    dependencies = ["data"]
+
     def calculate_description(self, obj):
         """Creates a dataframe containing the data for a gallery."""
         df = obj.data[["id", "area", "num_annotations", "label", "bbox_ratio", "bbox_width", "bbox_height", "width", "height"]].drop_duplicates().reset_index(drop=True)
@@ -265,9 +489,11 @@ class BboxRecordDataset(RecordDataset):
     stats_class = ClassStatsDescriptorBbox()
     stats = StatsDescriptorBbox()
 
-    def __init__(self, records: Union[List[BaseRecord], ObservableList, str], class_map=None, name=None, description=None):
+    def __init__(self, records: Union[List[BaseRecord], ObservableList, BboxRecordColumns, str], class_map=None, name=None, description=None):
+        """`records` can be `BboxRecordColumns` to keep the annotations as compact arrays instead of records, see `load_from_record_dataframe` and `to_columns`."""
         super().__init__(records, class_map, name, description)
-        self.record_index_image_id_map = {str(record.filepath): index for index, record in enumerate(self.records)}
+        filepaths = self.records.filepaths if isinstance(self.records, BboxRecordColumns) else (str(record.filepath) for record in self.records)
+        self.record_index_image_id_map = {filepath: index for index, filepath in enumerate(filepaths)}
         self.data = None
         self.gallery_data = None
         self.stats_dataset = None
@@ -279,52 +505,160 @@ class BboxRecordDataset(RecordDataset):
     def parse_df_to_records(record_data_df, class_map):
         return BboxRecordDataframeParser(record_data_df, class_map).parse(RandomSplitter([1]))[0]
 
+    @classmethod
+    def load_from_record_dataframe(cls, record_data_df: pd.DataFrame, class_map=None, name=None, description=None, columnar=False):
+        """If `columnar` is True the records are stored as `BboxRecordColumns`, which doesn't require to parse the dataframe into records."""
+        if not columnar:
+            return super().load_from_record_dataframe(record_data_df, class_map, name, description)
+        if class_map is None:
+            class_map = cls.create_class_map_from_record_df(record_data_df)
+        return cls(BboxRecordColumns.from_record_dataframe(record_data_df, class_map), class_map=class_map, name=name, description=description)
+
+    def save_binary(self, path):
+        """Saves the records as `BboxRecordColumns` together with the class map, name and description into a single binary file (see `write_array_file`)."""
+        columns = self.records if isinstance(self.records, BboxRecordColumns) else BboxRecordColumns.from_records(self.records, self.class_map)
+        class_map = self.class_map if self.class_map is not None else self.create_class_map_from_record_df(self.data)
+        arrays = {
+            # numeric record ids keep their type, other ids are stored as strings
+            "record_ids": np.array(columns.record_ids.tolist()), "filepaths": columns.filepaths, "widths": columns.widths, "heights": columns.heights,
+            "box_offsets": columns.box_offsets, "boxes": columns.boxes, "label_ids": columns.label_ids
+        }
+        write_array_file(path, arrays, {"name": self.name, "description": self.description, "class_map": class_map._id2class})
+
+    def load_from_binary_file(self, path, mmap=True):
+        """Loads a file saved with `save_binary`, the records are loaded as `BboxRecordColumns` and the boxes are memory mapped if `mmap` is True."""
+        arrays, metadata = read_array_file(path, mmap)
+        self.class_map = ClassMap(metadata["class_map"])
+        self._name = metadata["name"]
+        self._description = metadata["description"]
+        self.records = BboxRecordColumns(
+            arrays["record_ids"].astype(object), arrays["filepaths"], arrays["widths"], arrays["heights"], arrays["box_offsets"],
+            arrays["boxes"], arrays["label_ids"], self.class_map
+        )
+
+    def to_columns(self):
+        """Returns a new dataset with the records stored as `BboxRecordColumns`."""
+        records = self.records if isinstance(self.records, BboxRecordColumns) else BboxRecordColumns.from_records(self.records, self.class_map)
+        return type(self)(records, self.class_map, self.name, self.description)
+
+    def calculate_fingerprint(self):
+        if not isinstance(self.records, BboxRecordColumns):
+            return super().calculate_fingerprint()
+        fingerprint = hashlib.sha1(repr(self.class_map._id2class if self.class_map is not None else None).encode())
+        fingerprint.update(repr((self.records.record_ids.tolist(), self.records.filepaths.tolist())).encode())
+        for array in [self.records.widths, self.records.heights, self.records.box_offsets, self.records.boxes, self.records.label_ids]:
+            fingerprint.update(np.ascontiguousarray(array).tobytes())
+        return fingerprint.hexdigest()
+
+    def get_filepaths(self):
+        return self.records.filepaths.tolist() if isinstance(self.records, BboxRecordColumns) else super().get_filepaths()
+
+    @classmethod
+    def create_new_from_mask(cls, cls_instance, mask):
+        if not isinstance(cls_instance.records, BboxRecordColumns):
+            return super().create_new_from_mask(cls_instance, mask)
+        filepaths = np.unique(cls_instance.data[mask]["filepath"])
+        return cls(cls_instance.records.take(np.flatnonzero(np.isin(cls_instance.records.filepaths, filepaths))), cls_instance.class_map)
+
     def get_image_by_image_id(self, image_id, width, height):
         index = self.record_index_image_id_map[image_id]
         return draw_record_with_bokeh(self[index], display_bbox=True, class_map=self.class_map, width=None, height=height, return_figure=True)
 
 # Cell
 class PrecisionRecallMetricsDescriptorObjectDetection(DatasetDescriptor):
-    def __init__(self, ious=None):
+    """`executor` is passed to `APObjectDetectionFast`, it can be the number of worker processes or a `concurrent.futures.Executor`."""
+    def __init__(self, ious=None, executor: Optional[Union[int, Executor]] = None):
         if ious is None:
             self.ious = np.arange(0.5, 1, 0.05).round(2)
         else:
             self.ious = ious
+        self.executor = executor
+
+    def get_cache_params(self, obj):
+        return {"ious": np.asarray(self.ious).tolist()}
+
+    def calculate_description(self, obj):
+        if getattr(obj, "store", None) is not None:
+            return obj.store.get_metric_data_ap(self.ious)
+        return APObjectDetectionFast(obj.base_data, self.ious, self.executor).metric_data
+
+# Cell
+class ImageIndexDescriptor(DatasetDescriptor):
+    """Index of the rows of each image in the `base_data`, the images are identified by the values of `image_id_column`.
+    The description is a tuple of the row positions sorted by image and a dict with the start and end of the rows of each image in the sorted positions."""
+    cacheable = False
+
+    def __init__(self, image_id_column: str = "filepath"):
+        self.image_id_column = image_id_column
 
     def calculate_description(self, obj):
-        return APObjectDetectionFast(obj.base_data, self.ious).metric_data
+        image_codes, image_ids = pd.factorize(obj.base_data[self.image_id_column])
+        order = np.argsort(image_codes, kind="stable")
+        image_offsets = np.r_[0, np.cumsum(np.bincount(image_codes, minlength=len(image_ids)))].tolist()
+        return order, {image_id: (start, end) for image_id, start, end in zip(image_ids, image_offsets[:-1], image_offsets[1:])}
 
 # Cell
 class ObjectDetectionResultsDataset(GenericDataset):
-    """Dashboard dataset for the results of and object detection system."""
+    """Dashboard dataset for the results of and object detection system.
+    If the dataset is backed by an `ObjectDetectionResultsStore` (see `load_store`) the metric data is calculated chunk by chunk from the store.
+    If `dataframe` is None the `base_data` is only read from the store on first access, with the `store_columns` if given."""
     metric_data_ap = PrecisionRecallMetricsDescriptorObjectDetection()
+    image_index = ImageIndexDescriptor()
 
-    def __init__(self, dataframe, name=None, description=None):
+    def __init__(self, dataframe, name=None, description=None, store=None, store_columns=None):
+        self.store = store
+        self.store_columns = store_columns
         super().__init__(dataframe, name, description)
         # instanciate metric data and preload it
         self.metric_data_ap = None
-        self.class_map = ClassMap(self.base_data[["label", "label_num"]].drop_duplicates().sort_values("label_num")["label"].tolist())
+        self.image_index = None
+        if self.is_base_data_loaded or self.store is None:
+            labels = self.base_data[["label", "label_num"]].drop_duplicates()
+        else:
+            labels = self.store.read_unique(["label", "label_num"])
+        self.class_map = ClassMap(labels.sort_values("label_num")["label"].tolist())
+
+    @property
+    def base_data(self):
+        if self._base_data is None and self.store is not None:
+            self._base_data = self.store.read(self.store_columns)
+        return self._base_data
+
+    @base_data.setter
+    def base_data(self, value):
+        self._base_data = value
+
+    @property
+    def is_base_data_loaded(self) -> bool:
+        return self._base_data is not None
+
+    def calculate_fingerprint(self) -> str:
+        """The fingerprint of a dataset backed by a store is calculated from the chunk files of the store, so the rows don't have to be loaded."""
+        if self.store is None:
+            return super().calculate_fingerprint()
+        return self.store.get_fingerprint(self.store_columns)
 
     def save(self, path):
         if not os.path.exists(os.path.join(*path.split("/")[:-1])):
             os.makedirs(os.path.join(*path.split("/")[:-1]))
         self.base_data.to_csv(path)
 
+    def get_image_rows(self, image_id) -> pd.DataFrame:
+        """Returns the rows of the image with the filepath `image_id`, only the rows of the image are accessed (see `image_index`)."""
+        order, image_offsets = self.image_index
+        start, end = image_offsets[image_id]
+        return self.base_data.iloc[order[start:end]]
+
+    def get_image_records(self, image_id):
+        """Returns the ground truth record and the prediction record of an image, a record without boxes if the image has no ground truths or predictions."""
+        image_rows = self.get_image_rows(image_id)
+        columns = BboxRecordColumns.from_record_dataframe(image_rows, self.class_map)
+        is_prediction = image_rows["is_prediction"].to_numpy(dtype=bool)
+        return columns.filter_boxes(~is_prediction)[0], columns.filter_boxes(is_prediction)[0]
+
     def get_image_by_image_id(self, image_id, width=None, height=None):
         """For gallery dashboards"""
-        df_pred = self.base_data[(self.base_data["filepath"] == image_id) & (self.base_data["is_prediction"] == True)]
-        df_gt = self.base_data[(self.base_data["filepath"] == image_id) & (self.base_data["is_prediction"] == False)]
-
-        parser_pred = BboxRecordDataframeParser(df_pred, self.class_map)
-        parser_gt = BboxRecordDataframeParser(df_gt, self.class_map)
-        res_gt = parser_gt.parse(show_pbar=False, autofix=False)[1][0]
-        res_pred = parser_pred.parse(show_pbar=False, autofix=False)[1]
-        if len(res_pred) == 0:
-            res_pred = deepcopy(res_gt)
-            res_pred["labels"] = []
-            res_pred["bboxes"] = []
-        else:
-            res_pred = res_pred[0]
+        res_gt, res_pred = self.get_image_records(image_id)
         plot_gt = draw_record_with_bokeh(res_gt, display_bbox=True, return_figure=True, width=width, height=height)
         plot_pred = draw_record_with_bokeh(res_pred, display_bbox=True, return_figure=True, width=width, height=height)
         return pn.Row(pn.Column(pn.Row("<b>Ground Truth</b>",  align="center"), plot_gt), pn.Column(pn.Row("<b>Prediction</b>",  align="center"), plot_pred))
@@ -335,68 +669,169 @@ class ObjectDetectionResultsDataset(GenericDataset):
         return cls(df, None, None)
 
     @classmethod
-    def init_from_preds_and_samples(cls, predictions, samples_plus_losses, padded_along_shortest=True, class_map=None, name=None, description=None):
-        """The input_records are required because they are the only information source with the image stats(width, etc.) for the image on the disk."""
-        data = []
-        for index, (prediction, sample_plus_loss) in enumerate(zip(predictions, samples_plus_losses)):
-            # TODO: At the moment only resize_and_pad or resize are handelt. Check if there are other edge cases that need to be included
-            # The correction requires that the sample_plus_loss has the scaled image sizes (not the padded ones or the original ones)
-            # correct the width and height to the values of the original image
-            prediction = prediction.pred.as_dict()["detection"]
-            if len(prediction["labels"]) == 0:
-                raise ValueError("Not predictions, can't build dashboard")
-            losses = sample_plus_loss.losses
-            sample_plus_loss = sample_plus_loss.as_dict()
-            img = Image.open(sample_plus_loss["common"]["filepath"])
-            width = img.size[0]
-            height = img.size[1]
-            # use bool to int for padded_along_shortest and int(sample_plus_loss["width"] < sample_plus_loss["height"]) to avoid if branches
-            factor = max(width, height)/max(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"])
-            padding = max(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"]) - min(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"])
-            # at the end /2 due to symmetric padding
-            correct_x = lambda x: factor * (x - int(padded_along_shortest) * int(sample_plus_loss["common"]["width"] < sample_plus_loss["common"]["height"]) * padding/2)
-            correct_y = lambda y: factor * (y - int(padded_along_shortest) * int(sample_plus_loss["common"]["width"] > sample_plus_loss["common"]["height"]) * padding/2)
-            for label, bbox, score in zip(prediction["labels"], prediction["bboxes"], prediction["scores"]):
-                xmin, xmax, ymin, ymax = correct_x(bbox.xmin), correct_x(bbox.xmax), correct_y(bbox.ymin), correct_y(bbox.ymax)
-                file_stats = sample_plus_loss["common"]["filepath"].stat()
-                bbox_width = xmax - xmin
-                bbox_height = ymax - ymin
-                area = bbox_width * bbox_height
-                area_normalized = area / (width * height)
-                bbox_ratio = bbox_width / bbox_height
-                data.append(
-                    {
-                        "id": sample_plus_loss["common"]["record_id"], "width": width, "height": height, "label": label, "area_square_root": area**2, "area_square_root_normalized": area_normalized**2,
-                        "score": score, "bbox_xmin": xmin, "bbox_xmax": xmax, "bbox_ymin": ymin, "bbox_ymax": ymax, "area": area,
-                        "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": index, "bbox_width": bbox_width,
-                        "bbox_height": bbox_height, "filepath": str(sample_plus_loss["common"]["filepath"]), "filename": str(sample_plus_loss["common"]["filepath"]).split("/")[-1], "creation_date": datetime.datetime.fromtimestamp(file_stats.st_ctime),
-                        "modification_date": datetime.datetime.fromtimestamp(file_stats.st_mtime), "num_annotations": len(prediction["bboxes"]), "is_prediction": True,
-                        "loss_classifier": losses["loss_classifier"], "loss_box_reg": losses["loss_box_reg"], "loss_objectness": losses["loss_objectness"],
-                        "loss_rpn_box_reg": losses["loss_rpn_box_reg"], "loss_total": losses["loss_total"]
-                    }
-                )
-            for label, bbox in zip(sample_plus_loss["detection"]["labels"], sample_plus_loss["detection"]["bboxes"]):
-                xmin, xmax, ymin, ymax = correct_x(bbox.xmin), correct_x(bbox.xmax), correct_y(bbox.ymin), correct_y(bbox.ymax)
-                file_stats = sample_plus_loss["common"]["filepath"].stat()
-                bbox_width = xmax - xmin
-                bbox_height = ymax - ymin
-                area = bbox_width * bbox_height
-                area_normalized = area / (width * height)
-                bbox_ratio = bbox_width / bbox_height
-                data.append(
-                    {
-                        "id": sample_plus_loss["common"]["record_id"], "width": width, "height": height, "label": label,
-                        "score": 999, "bbox_xmin": xmin, "bbox_xmax": xmax, "bbox_ymin": ymin, "bbox_ymax": ymax, "area": area, "area_square_root": area**2, "area_square_root_normalized": area_normalized**2,
-                        "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": index, "bbox_width": bbox_width,
-                        "bbox_height": bbox_height, "filepath": str(sample_plus_loss["common"]["filepath"]), "filename": str(sample_plus_loss["common"]["filepath"]).split("/")[-1], "creation_date": datetime.datetime.fromtimestamp(file_stats.st_ctime),
-                        "modification_date": datetime.datetime.fromtimestamp(file_stats.st_mtime), "num_annotations": len(prediction["bboxes"]), "is_prediction": False,
-                        "loss_classifier": losses["loss_classifier"], "loss_box_reg": losses["loss_box_reg"], "loss_objectness": losses["loss_objectness"],
-                        "loss_rpn_box_reg": losses["loss_rpn_box_reg"], "loss_total": losses["loss_total"]
-                    }
-                )
-        data = pd.DataFrame(data)
+    def load_store(cls, path, columns=None, name=None, description=None):
+        """Creates the dataset from an `ObjectDetectionResultsStore` without reading the rows, the `base_data` is read from the store on first access.
+        `columns` can be used to load only a subset of the columns into `base_data`."""
+        return cls(None, name, description, store=ObjectDetectionResultsStore(path), store_columns=columns)
+
+    @classmethod
+    def init_from_preds_and_samples(
+        cls, predictions, samples_plus_losses, padded_along_shortest=True, class_map=None, name=None, description=None, store_path=None, images_per_chunk=1000,
+        num_workers: Optional[int] = None, progress_callback: Optional[Callable] = None, store_columns: Optional[List[str]] = None
+    ):
+        """The input_records are required because they are the only information source with the image stats(width, etc.) for the image on the disk.
+        If `store_path` is given the rows are streamed into an `ObjectDetectionResultsStore` instead of being collected in memory, so
+        `predictions` and `samples_plus_losses` can be iterators. The returned dataset reads its `base_data` (only the `store_columns` if given) lazily from the store (see `load_store`).
+        The file metadata is collected with `num_workers` threads (see `collect_file_metadata`)."""
+        if store_path is not None:
+            ObjectDetectionResultsStore.write_preds_and_samples(
+                store_path, zip(predictions, samples_plus_losses), padded_along_shortest, class_map, images_per_chunk, num_workers, progress_callback
+            )
+            return cls.load_store(store_path, columns=store_columns, name=name, description=description)
+        data = cls.get_rows_from_preds_and_samples(zip(predictions, samples_plus_losses), padded_along_shortest, num_workers=num_workers, progress_callback=progress_callback)
+        return cls(cls.rows_to_dataframe(data, class_map), name, description)
+
+    @classmethod
+    def get_rows_from_preds_and_samples(cls, preds_and_samples, padded_along_shortest=True, start_index=0, num_workers=None, progress_callback=None):
+        """Returns the rows of all (prediction, sample_plus_loss) pairs, the file dates and image sizes of all images are collected in parallel first.
+        The record indices start at `start_index`."""
+        preds_and_samples = list(preds_and_samples)
+        file_metadata = collect_file_metadata(
+            [sample_plus_loss.filepath for _, sample_plus_loss in preds_and_samples], read_image_size=True, num_workers=num_workers, progress_callback=progress_callback
+        )
+        rows = []
+        for index, ((prediction, sample_plus_loss), metadata) in enumerate(zip(preds_and_samples, file_metadata), start_index):
+            rows.extend(cls.get_rows_from_pred_and_sample(index, prediction, sample_plus_loss, padded_along_shortest, metadata))
+        return rows
+
+    @staticmethod
+    def get_rows_from_pred_and_sample(index, prediction, sample_plus_loss, padded_along_shortest=True, file_metadata=None):
+        """Returns the rows (dicts) of the predicted and ground truth boxes of a single prediction and sample_plus_loss pair.
+        `file_metadata` is the result of `get_file_metadata` with the image size for the image, it is collected if not given."""
+        # TODO: At the moment only resize_and_pad or resize are handelt. Check if there are other edge cases that need to be included
+        # The correction requires that the sample_plus_loss has the scaled image sizes (not the padded ones or the original ones)
+        # correct the width and height to the values of the original image
+        prediction = prediction.pred.as_dict()["detection"]
+        if len(prediction["labels"]) == 0:
+            raise ValueError("Not predictions, can't build dashboard")
+        losses = sample_plus_loss.losses
+        sample_plus_loss = sample_plus_loss.as_dict()
+        if file_metadata is None:
+            file_metadata = get_file_metadata(sample_plus_loss["common"]["filepath"], read_image_size=True)
+        width = file_metadata["width"]
+        height = file_metadata["height"]
+        # use bool to int for padded_along_shortest and int(sample_plus_loss["width"] < sample_plus_loss["height"]) to avoid if branches
+        factor = max(width, height)/max(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"])
+        padding = max(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"]) - min(sample_plus_loss["common"]["width"], sample_plus_loss["common"]["height"])
+        # at the end /2 due to symmetric padding
+        correct_x = lambda x: factor * (x - int(padded_along_shortest) * int(sample_plus_loss["common"]["width"] < sample_plus_loss["common"]["height"]) * padding/2)
+        correct_y = lambda y: factor * (y - int(padded_along_shortest) * int(sample_plus_loss["common"]["width"] > sample_plus_loss["common"]["height"]) * padding/2)
+        rows = []
+        for label, bbox, score in zip(prediction["labels"], prediction["bboxes"], prediction["scores"]):
+            xmin, xmax, ymin, ymax = correct_x(bbox.xmin), correct_x(bbox.xmax), correct_y(bbox.ymin), correct_y(bbox.ymax)
+            bbox_width = xmax - xmin
+            bbox_height = ymax - ymin
+            area = bbox_width * bbox_height
+            area_normalized = area / (width * height)
+            bbox_ratio = bbox_width / bbox_height
+            rows.append(
+                {
+                    "id": sample_plus_loss["common"]["record_id"], "width": width, "height": height, "label": label, "area_square_root": area**2, "area_square_root_normalized": area_normalized**2,
+                    "score": score, "bbox_xmin": xmin, "bbox_xmax": xmax, "bbox_ymin": ymin, "bbox_ymax": ymax, "area": area,
+                    "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": index, "bbox_width": bbox_width,
+                    "bbox_height": bbox_height, "filepath": str(sample_plus_loss["common"]["filepath"]), "filename": str(sample_plus_loss["common"]["filepath"]).split("/")[-1], "creation_date": file_metadata["creation_date"],
+                    "modification_date": file_metadata["modification_date"], "num_annotations": len(prediction["bboxes"]), "is_prediction": True,
+                    "loss_classifier": losses["loss_classifier"], "loss_box_reg": losses["loss_box_reg"], "loss_objectness": losses["loss_objectness"],
+                    "loss_rpn_box_reg": losses["loss_rpn_box_reg"], "loss_total": losses["loss_total"]
+                }
+            )
+        for label, bbox in zip(sample_plus_loss["detection"]["labels"], sample_plus_loss["detection"]["bboxes"]):
+            xmin, xmax, ymin, ymax = correct_x(bbox.xmin), correct_x(bbox.xmax), correct_y(bbox.ymin), correct_y(bbox.ymax)
+            bbox_width = xmax - xmin
+            bbox_height = ymax - ymin
+            area = bbox_width * bbox_height
+            area_normalized = area / (width * height)
+            bbox_ratio = bbox_width / bbox_height
+            rows.append(
+                {
+                    "id": sample_plus_loss["common"]["record_id"], "width": width, "height": height, "label": label,
+                    "score": 999, "bbox_xmin": xmin, "bbox_xmax": xmax, "bbox_ymin": ymin, "bbox_ymax": ymax, "area": area, "area_square_root": area**2, "area_square_root_normalized": area_normalized**2,
+                    "area_normalized": area_normalized, "bbox_ratio": bbox_ratio, "record_index": index, "bbox_width": bbox_width,
+                    "bbox_height": bbox_height, "filepath": str(sample_plus_loss["common"]["filepath"]), "filename": str(sample_plus_loss["common"]["filepath"]).split("/")[-1], "creation_date": file_metadata["creation_date"],
+                    "modification_date": file_metadata["modification_date"], "num_annotations": len(prediction["bboxes"]), "is_prediction": False,
+                    "loss_classifier": losses["loss_classifier"], "loss_box_reg": losses["loss_box_reg"], "loss_objectness": losses["loss_objectness"],
+                    "loss_rpn_box_reg": losses["loss_rpn_box_reg"], "loss_total": losses["loss_total"]
+                }
+            )
+        return rows
+
+    @staticmethod
+    def rows_to_dataframe(rows, class_map=None):
+        data = pd.DataFrame(rows)
         data["label_num"] = data["label"]
         if class_map is not None:
             data["label"] = data["label"].apply(class_map.get_by_id)
+        return data
+
+# Cell
+class ObjectDetectionResultsStore:
+    """On disk columnar store for the rows of `ObjectDetectionResultsDataset`, the rows are stored in chunks as parquet files in the
+    directory `path` (requires pyarrow or fastparquet). The chunks are read lazily and only the requested columns are loaded."""
+    METRIC_COLUMNS = ["label", "score", "is_prediction", "bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax", "area", "filepath"]
 
-        return cls(data, name, description)
\ No newline at end of file
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @property
+    def chunk_files(self):
+        return sorted(os.path.join(self.path, file_name) for file_name in os.listdir(self.path) if file_name.endswith(".parquet"))
+
+    def append(self, df):
+        """Writes the dataframe as new chunk."""
+        df.to_parquet(os.path.join(self.path, f"part-{len(self.chunk_files):05d}.parquet"), index=False)
+
+    @classmethod
+    def write_preds_and_samples(cls, path, preds_and_samples, padded_along_shortest=True, class_map=None, images_per_chunk=1000, num_workers=None, progress_callback=None):
+        """Writes an iterable of (prediction, sample_plus_loss) pairs to a new store, only the pairs and rows of one chunk of images are kept in memory.
+        The file metadata of a chunk is collected with `num_workers` threads, `progress_callback` is called for the files of each chunk."""
+        store = cls(path)
+        if len(store.chunk_files) > 0:
+            raise ValueError(f"{path} already contains a store")
+        chunk, start_index = [], 0
+        for pred_and_sample in preds_and_samples:
+            chunk.append(pred_and_sample)
+            if len(chunk) == images_per_chunk:
+                rows = ObjectDetectionResultsDataset.get_rows_from_preds_and_samples(chunk, padded_along_shortest, start_index, num_workers, progress_callback)
+                store.append(ObjectDetectionResultsDataset.rows_to_dataframe(rows, class_map))
+                chunk, start_index = [], start_index + len(chunk)
+        if len(chunk) > 0:
+            rows = ObjectDetectionResultsDataset.get_rows_from_preds_and_samples(chunk, padded_along_shortest, start_index, num_workers, progress_callback)
+            store.append(ObjectDetectionResultsDataset.rows_to_dataframe(rows, class_map))
+        return store
+
+    def iter_chunks(self, columns=None):
+        for chunk_file in self.chunk_files:
+            yield pd.read_parquet(chunk_file, columns=columns)
+
+    def read(self, columns=None):
+        return pd.concat(list(self.iter_chunks(columns)), ignore_index=True)
+
+    def read_unique(self, columns):
+        """Returns the unique combinations of the values in `columns`, only one chunk of the columns is loaded at a time."""
+        return pd.concat([chunk.drop_duplicates() for chunk in self.iter_chunks(columns)], ignore_index=True).drop_duplicates(ignore_index=True)
+
+    def get_fingerprint(self, columns=None) -> str:
+        """Fingerprint of the chunk files (name, size and modification time) and the loaded `columns`."""
+        fingerprint = hashlib.sha1(repr(columns).encode())
+        for chunk_file in self.chunk_files:
+            stat = os.stat(chunk_file)
+            fingerprint.update(repr((os.path.basename(chunk_file), stat.st_size, stat.st_mtime_ns)).encode())
+        return fingerprint.hexdigest()
+
+    def get_metric_data_ap(self, ious=None):
+        """Calculates the metric data of `APObjectDetectionFast` incrementally chunk by chunk, only the columns required for the metrics are loaded."""
+        ap = APObjectDetectionFast(ious=ious)
+        for chunk in self.iter_chunks(self.METRIC_COLUMNS):
+            ap.update(chunk)
+        return ap.compute()
\ No newline at end of file
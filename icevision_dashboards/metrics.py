@@ -1,16 +1,155 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/metrics.ipynb (unless otherwise specified).
 
-__all__ = ['AP', 'APObjectDetection', 'APObjectDetectionFast']
+__all__ = ['DetectionBoxes', 'MatchState', 'AP', 'APObjectDetection', 'APObjectDetectionFast',
+           'calculate_class_metric_data_from_shared_memory']
 
 # Cell
 from typing import Union, Optional, Any, Iterable, Callable
 import os
 import shutil
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 import numpy as np
+import pandas as pd
 from shapely.geometry import Polygon
 
+# Cell
+class DetectionBoxes:
+    """Columnar representation of the ground truth and predicted boxes of a dataframe, used by the AP metrics.
+    The boxes are stored as one (N, 4) array each for ground truths and predictions, sorted by class and image (predictions additionally by descending score).
+    The boxes of class `i` are the rows `gt_offsets[i]:gt_offsets[i+1]` (`pred_offsets` for predictions) and within a class the boxes of an image are contiguous.
+    Labels and images are stored as integer codes into `class_names` and `image_ids`."""
+    BOX_COLS = ["bbox_xmin", "bbox_ymin", "bbox_xmax", "bbox_ymax"]
+    ARRAY_NAMES = ["gt_boxes", "gt_image_codes", "gt_offsets", "pred_boxes", "pred_scores", "pred_image_codes", "pred_offsets"]
+
+    def __init__(self, class_names, image_ids, gt_boxes, gt_image_codes, gt_offsets, pred_boxes, pred_scores, pred_image_codes, pred_offsets):
+        self.class_names = class_names
+        self.image_ids = image_ids
+        self.gt_boxes = gt_boxes
+        self.gt_image_codes = gt_image_codes
+        self.gt_offsets = gt_offsets
+        self.pred_boxes = pred_boxes
+        self.pred_scores = pred_scores
+        self.pred_image_codes = pred_image_codes
+        self.pred_offsets = pred_offsets
+
+    @classmethod
+    def from_dataframe(cls, df, image_id_col="filename"):
+        """Creates the columnar representation from a dataframe with the columns label, score, is_prediction, the bbox columns and the `image_id_col`."""
+        class_codes, class_names = pd.factorize(df["label"], sort=True)
+        image_codes, image_ids = pd.factorize(df[image_id_col], sort=True)
+        boxes = df[cls.BOX_COLS].to_numpy(dtype=float)
+        scores = df["score"].to_numpy(dtype=float)
+        is_prediction = df["is_prediction"].to_numpy(dtype=bool)
+
+        gt_rows = np.flatnonzero(~is_prediction)
+        gt_rows = gt_rows[np.lexsort((image_codes[gt_rows], class_codes[gt_rows]))]
+        pred_rows = np.flatnonzero(is_prediction)
+        pred_rows = pred_rows[np.lexsort((-scores[pred_rows], image_codes[pred_rows], class_codes[pred_rows]))]
+        return cls(
+            np.asarray(class_names, dtype=object), np.asarray(image_ids, dtype=object),
+            boxes[gt_rows], image_codes[gt_rows], cls.get_offsets(class_codes[gt_rows], len(class_names)),
+            boxes[pred_rows], scores[pred_rows], image_codes[pred_rows], cls.get_offsets(class_codes[pred_rows], len(class_names))
+        )
+
+    @staticmethod
+    def get_offsets(sorted_codes, num_codes):
+        """Returns the start offsets of each code in the sorted codes, with the total length as last entry."""
+        return np.searchsorted(sorted_codes, np.arange(num_codes+1))
+
+    @staticmethod
+    def split_by_image(image_codes):
+        """Returns the image codes and the start and end offsets of the contiguous images in `image_codes`."""
+        starts = np.flatnonzero(np.r_[True, image_codes[1:] != image_codes[:-1]]) if len(image_codes) > 0 else np.zeros(0, dtype=int)
+        ends = np.r_[starts[1:], len(image_codes)].astype(int)
+        return image_codes[starts], starts, ends
+
+    def get_class_boxes(self, class_index):
+        """Returns the ground truth boxes, ground truth image codes, predicted boxes, prediction scores and prediction image codes of a class."""
+        gt_slice = slice(self.gt_offsets[class_index], self.gt_offsets[class_index+1])
+        pred_slice = slice(self.pred_offsets[class_index], self.pred_offsets[class_index+1])
+        return self.gt_boxes[gt_slice], self.gt_image_codes[gt_slice], self.pred_boxes[pred_slice], self.pred_scores[pred_slice], self.pred_image_codes[pred_slice]
+
+    def num_gt_boxes(self, class_index):
+        return self.gt_offsets[class_index+1] - self.gt_offsets[class_index]
+
+    def num_pred_boxes(self, class_index):
+        return self.pred_offsets[class_index+1] - self.pred_offsets[class_index]
+
+    def to_shared_memory(self):
+        """Copies the box arrays into a single shared memory block, the class names and image ids are not copied.
+        Returns the block, which has to be closed and unlinked by the caller, and a picklable description for `from_shared_memory`."""
+        arrays = [np.ascontiguousarray(getattr(self, array_name)) for array_name in self.ARRAY_NAMES]
+        layout, size = {}, 0
+        for array_name, array in zip(self.ARRAY_NAMES, arrays):
+            layout[array_name] = (size, array.shape, array.dtype.str)
+            # keep every array 8 byte aligned
+            size += array.nbytes + (-array.nbytes) % 8
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        for array_name, array in zip(self.ARRAY_NAMES, arrays):
+            offset, shape, dtype = layout[array_name]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[...] = array
+        return shm, (shm.name, layout)
+
+    @classmethod
+    def from_shared_memory(cls, description):
+        """Creates `DetectionBoxes` backed by the shared memory block created by `to_shared_memory`, without copying the arrays.
+        The block is kept in the `shared_memory` attribute and should be closed once the boxes are no longer used."""
+        name, layout = description
+        shm = shared_memory.SharedMemory(name=name)
+        arrays = {array_name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset) for array_name, (offset, shape, dtype) in layout.items()}
+        boxes = cls(None, None, **arrays)
+        boxes.shared_memory = shm
+        return boxes
+
+# Cell
+class MatchState:
+    """Accumulated matching results of a class for the incremental AP calculation of `APObjectDetectionFast`.
+    The scores of all predictions are kept sorted ascending, together with the image of each prediction, whether it is counted
+    (predictions on images without ground truths are not) and its new match mask (shape (num_ious, num_preds), see `APObjectDetectionFast.match_by_score`)."""
+    def __init__(self, num_ious):
+        self.scores = np.zeros(0)
+        self.image_ids = np.zeros(0, dtype=object)
+        self.counted = np.zeros(0, dtype=bool)
+        self.new_matches = np.zeros((num_ious, 0), dtype=bool)
+        self.num_gts = {}
+
+    @property
+    def num_gt_boxes(self):
+        return sum(self.num_gts.values())
+
+    def add(self, num_gts, scores, image_ids, counted, new_matches):
+        """Adds the predictions of new images and the number of ground truths per image (dict with the image ids as keys)."""
+        self.num_gts.update(num_gts)
+        order = np.argsort(scores, kind="stable")
+        positions = np.searchsorted(self.scores, scores[order])
+        self.scores = np.insert(self.scores, positions, scores[order])
+        self.image_ids = np.insert(self.image_ids, positions, np.asarray(image_ids, dtype=object)[order])
+        self.counted = np.insert(self.counted, positions, counted[order])
+        self.new_matches = np.insert(self.new_matches, positions, new_matches[:, order], axis=1)
+
+    def remove_images(self, image_ids):
+        """Removes the predictions and ground truths of the images."""
+        for image_id in image_ids:
+            self.num_gts.pop(image_id, None)
+        keep = ~pd.Series(self.image_ids, dtype=object).isin(image_ids).to_numpy()
+        if not keep.all():
+            self.scores, self.image_ids, self.counted = self.scores[keep], self.image_ids[keep], self.counted[keep]
+            self.new_matches = self.new_matches[:, keep]
+
+    def get_counts(self):
+        """Returns the score thresholds (the distinct scores sorted ascending), the number of active predictions and the number
+        of true positives (shape (num_ious, num_score_thresholds)) for each threshold."""
+        threshold_starts = np.flatnonzero(np.r_[True, self.scores[1:] != self.scores[:-1]]) if len(self.scores) > 0 else np.zeros(0, dtype=int)
+        # a prediction is active for every score threshold lower or equal to its own score
+        cum_counted = np.r_[0, np.cumsum(self.counted)]
+        cum_matches = np.concatenate([np.zeros((len(self.new_matches), 1), dtype=int), np.cumsum(self.new_matches & self.counted, axis=1)], axis=1)
+        active_preds = cum_counted[-1] - cum_counted[threshold_starts]
+        tps = cum_matches[:, -1:] - cum_matches[:, threshold_starts]
+        return self.scores[threshold_starts], active_preds, tps
+
 # Cell
 class AP(ABC):
     """Abstarct base class for the AP score and further metrics based on it."""
@@ -209,40 +348,47 @@ class APObjectDetection(AP):
             return df[96**2 < df["area"]]
 
     @staticmethod
-    def prepare_data(df):
-        ground_truth, preds = df[df["is_prediction"] == False].sort_values("score"), df[df["is_prediction"] == True].sort_values("score")
-
-        pred_dict = {}
-        for index, row in preds.iterrows():
-            polygon = Polygon([[row["bbox_xmin"], row["bbox_ymax"]], [row["bbox_xmin"], row["bbox_ymin"]], [row["bbox_xmax"], row["bbox_ymin"], [row["bbox_xmax"], row["bbox_ymax"]]]])
-            if row["label"] not in pred_dict.keys():
-                pred_dict[row["label"]] = {row["score"]: {"bboxes": [polygon], "filename": [row["filename"]]}}
-            else:
-                if not row["filename"] in pred_dict[row["label"]].keys():
-                    pred_dict[row["label"]][row["score"]] = {"bboxes": [polygon], "filename": [row["filename"]]}
-                else:
-                    pred_dict[row["label"]][row["score"]]["bboxes"].append(polygon)
-                    pred_dict[row["label"]][row["score"]]["filename"].append(row["filename"])
-
-        gt_dict = {}
-        for index, row in ground_truth.iterrows():
-            polygon = Polygon([[row["bbox_xmin"], row["bbox_ymax"]], [row["bbox_xmin"], row["bbox_ymin"]], [row["bbox_xmax"], row["bbox_ymin"], [row["bbox_xmax"], row["bbox_ymax"]]]])
-            if row["label"] not in gt_dict.keys():
-                gt_dict[row["label"]] = {row["filename"]: [polygon]}
-            else:
-                if not row["filename"] in gt_dict[row["label"]].keys():
-                    gt_dict[row["label"]][row["filename"]] = [polygon]
-                else:
-                    gt_dict[row["label"]]["filename"].append(polygon)
+    def box_to_polygon(box):
+        xmin, ymin, xmax, ymax = box
+        return Polygon([[xmin, ymax], [xmin, ymin], [xmax, ymin], [xmax, ymax]])
+
+    @classmethod
+    def prepare_data(cls, df):
+        boxes = DetectionBoxes.from_dataframe(df)
+
+        gt_dict, pred_dict = {}, {}
+        for class_index, class_name in enumerate(boxes.class_names):
+            gt_boxes, gt_image_codes, pred_boxes, pred_scores, pred_image_codes = boxes.get_class_boxes(class_index)
+            for image_code, start, end in zip(*boxes.split_by_image(gt_image_codes)):
+                gt_dict.setdefault(class_name, {})[boxes.image_ids[image_code]] = [cls.box_to_polygon(box) for box in gt_boxes[start:end]]
+            if len(pred_scores) == 0:
+                continue
+            # predictions with the same score share an entry, entries are sorted by ascending score
+            order = np.argsort(pred_scores, kind="stable")
+            scores, score_starts = np.unique(pred_scores[order], return_index=True)
+            pred_dict[class_name] = {
+                score: {
+                    "bboxes": [cls.box_to_polygon(box) for box in pred_boxes[score_order]],
+                    "filename": boxes.image_ids[pred_image_codes[score_order]].tolist()
+                } for score, score_order in zip(scores, np.split(order, score_starts[1:]))
+            }
         return gt_dict, pred_dict
 
 # Cell
 class APObjectDetectionFast:
-    """A faster implementaiton for the (m)AP scores."""
-    def __init__(self, data, ious=None):
+    """A faster implementaiton for the (m)AP scores.
+    `executor` is optional and can be either the number of worker processes or a `concurrent.futures.Executor`, in which case
+    the (m)AP of each class and area range is calculated in parallel. The boxes are shared with the workers via shared memory.
+    The metrics can also be calculated incrementally, `update` adds a batch of data (only the new images are matched) and `compute`
+    returns the metric data of `data` and all batches added so far."""
+    ANALYSIS_TYPES = ["AP", "AP_small", "AP_medium", "AP_large"]
+
+    def __init__(self, data=None, ious=None, executor: Optional[Union[int, Executor]] = None):
         self.data = data
         self.ious = ious if ious is not None else np.arange(0.5, 1, 0.05).round(2)
-        self.metric_data = self.get_metric_data()
+        self.executor = executor
+        self.class_states = None
+        self.metric_data = self.get_metric_data() if data is not None else self.compute()
 
     @staticmethod
     def calculate_iou(pred_box, gt_box):
@@ -263,6 +409,45 @@ class APObjectDetectionFast:
             iou = intersection_area / (gt_box_area + pred_box_area - intersection_area)
             return iou
 
+    @staticmethod
+    def calculate_ious(pred_boxes, gt_boxes):
+        """Vectorized version of `calculate_iou`. Returns the iou matrix with the shape (num_pred_boxes, num_gt_boxes)."""
+        pred_boxes = np.asarray(pred_boxes, dtype=float).reshape(-1, 4)
+        gt_boxes = np.asarray(gt_boxes, dtype=float).reshape(-1, 4)
+        px1, py1, px2, py2 = [pred_boxes[:, [i]] for i in range(4)]
+        tx1, ty1, tx2, ty2 = [gt_boxes[:, i] for i in range(4)]
+
+        # negative extents mean the boxes don't intersect
+        intersection_width = np.clip(np.minimum(tx2, px2) - np.maximum(tx1, px1), 0, None)
+        intersection_height = np.clip(np.minimum(ty2, py2) - np.maximum(ty1, py1), 0, None)
+        intersection_area = intersection_width * intersection_height
+        gt_box_area = (tx2-tx1) * (ty2-ty1)
+        pred_box_area = (px2-px1) * (py2-py1)
+        union_area = gt_box_area + pred_box_area - intersection_area
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ious = np.where(union_area > 0, intersection_area / union_area, 0)
+        return ious
+
+    @staticmethod
+    def match_greedy(ious, iou_threshold):
+        """Greedily matches predictions (rows) and ground truths (columns) of the iou matrix, starting with the highest iou.
+        Returns the indices of the matched predictions and ground truths."""
+        pred_box_indices, gt_box_indices = np.nonzero(ious >= iou_threshold)
+        indices_descending = np.argsort(ious[pred_box_indices, gt_box_indices])[::-1]
+        pred_matched = np.zeros(ious.shape[0], dtype=bool)
+        gt_matched = np.zeros(ious.shape[1], dtype=bool)
+        pred_match_indices, gt_match_indices = [], []
+        max_matches = min(ious.shape)
+        for pred_index, gt_index in zip(pred_box_indices[indices_descending], gt_box_indices[indices_descending]):
+            if not (pred_matched[pred_index] or gt_matched[gt_index]):
+                pred_matched[pred_index] = True
+                gt_matched[gt_index] = True
+                pred_match_indices.append(pred_index)
+                gt_match_indices.append(gt_index)
+                if len(pred_match_indices) == max_matches:
+                    break
+        return np.array(pred_match_indices, dtype=int), np.array(gt_match_indices, dtype=int)
+
     def get_image_stats(self, gt_boxes, pred_boxes, iou_threshold):
         """
         Returns: tp, fp, fn
@@ -272,92 +457,120 @@ class APObjectDetectionFast:
         if len(gt_boxes) == 0:
             return 0, len(pred_boxes), 0
         else:
-            # calculate ious and log their mapping with box indices
-            gt_box_indices = []
-            pred_box_indices = []
-            ious = []
-            for pred_box_index, pred_box in enumerate(pred_boxes):
-                for gt_box_index, gt_box in enumerate(gt_boxes):
-                    iou = self.calculate_iou(pred_box, gt_box)
-                    if iou >= iou_threshold:
-                        gt_box_indices.append(gt_box_index)
-                        pred_box_indices.append(pred_box_index)
-                        ious.append(iou)
-
-            # check if any hits happend
-            if len(ious) == 0:
-                return 0, len(pred_boxes), len(gt_boxes)
-            else:
-                # select matches based on iou
-                indices_descending = np.argsort(ious)[::-1]
-                gt_match_indices = []
-                pred_match_indices = []
-                for index in indices_descending:
-                    gt_index = gt_box_indices[index]
-                    pred_index = pred_box_indices[index]
-                    if (gt_index not in gt_match_indices) and (pred_index not in pred_match_indices):
-                        gt_match_indices.append(gt_index)
-                        pred_match_indices.append(pred_index)
-                return len(gt_match_indices), len(pred_boxes) - len(pred_match_indices), len(gt_boxes) - len(gt_match_indices)
+            ious = self.calculate_ious(pred_boxes, gt_boxes)
+            pred_match_indices, gt_match_indices = self.match_greedy(ious, iou_threshold)
+            return len(gt_match_indices), len(pred_boxes) - len(pred_match_indices), len(gt_boxes) - len(gt_match_indices)
 
-    def get_precision_and_recall(self, gt, pred, iou):
-        """gt and pred need to be sored dicts with the lowest score being the first entry"""
-        tps, fps, fns = [], [], []
-        precisions, recalls, score_thresholds = [], [], []
+    @staticmethod
+    def match_by_score(ious, iou_thresholds):
+        """Adds the predictions (rows of the iou matrix, sorted by descending score) one after another to the greedy matching.
+        Returns a mask with the shape (num_iou_thresholds, num_preds) of the predictions that increased the number of matches.
+        After adding a prediction the matching is the same as the one of `match_greedy` for all predictions up to it, because a new
+        prediction can only take over a ground truth from a prediction with a lower iou, which then moves on to its next best ground truth.
+        The preferences are sorted once, for each threshold only the number of ground truths above it differs."""
+        num_preds, num_gts = ious.shape
+        # preferences of each prediction, ground truths sorted by descending iou
+        preference_order = np.argsort(-ious, axis=1, kind="stable")
+        sorted_ious = np.take_along_axis(ious, preference_order, axis=1)
+        num_candidates = (sorted_ious[:, :, None] >= np.asarray(iou_thresholds)[None, None, :]).sum(axis=1).T
+        new_matches = np.zeros((len(num_candidates), num_preds), dtype=bool)
+        for threshold_index, threshold_num_candidates in enumerate(num_candidates):
+            if threshold_num_candidates.sum() == 0:
+                continue
+            next_candidate = np.zeros(num_preds, dtype=int)
+            gt_matches = np.full(num_gts, -1)
+            for pred_index in range(num_preds):
+                proposer = pred_index
+                while next_candidate[proposer] < threshold_num_candidates[proposer]:
+                    gt_index = preference_order[proposer, next_candidate[proposer]]
+                    next_candidate[proposer] += 1
+                    holder = gt_matches[gt_index]
+                    if holder == -1:
+                        gt_matches[gt_index] = proposer
+                        new_matches[threshold_index, pred_index] = True
+                        break
+                    if ious[proposer, gt_index] > ious[holder, gt_index]:
+                        # the replaced prediction continues with its next best ground truth
+                        gt_matches[gt_index] = proposer
+                        proposer = holder
+        return new_matches
+
+    def get_precision_and_recall(self, boxes, class_index, iou):
+        """Calculates the precision recall curve and the AP for a class of the prepared `DetectionBoxes`."""
+        return self.get_precision_and_recall_for_ious(boxes, class_index, [iou])[iou]
+
+    @classmethod
+    def get_precision_and_recall_for_ious(cls, boxes, class_index, ious):
+        """Same as `get_precision_and_recall` but for multiple ious, the ious between the boxes are only calculated once. Returns a dict with the ious as keys."""
+        gt_boxes, _, _, pred_scores, _ = boxes.get_class_boxes(class_index)
+        if len(pred_scores) == 0:
+            return cls.get_empty_precision_and_recall(len(gt_boxes), ious)
+
+        # every distinct score is a threshold, sorted ascending
+        score_thresholds, pred_score_indices = np.unique(pred_scores, return_inverse=True)
+        pred_indices, new_matches = cls.match_class_boxes(boxes, class_index, ious)
+        score_indices = pred_score_indices[pred_indices]
+        # a prediction is active for every score threshold lower or equal to its own score
+        active_preds = np.cumsum(np.bincount(score_indices, minlength=len(score_thresholds))[::-1])[::-1]
+        tps = np.array([
+            np.cumsum(np.bincount(score_indices, weights=iou_new_matches, minlength=len(score_thresholds))[::-1])[::-1]
+            for iou_new_matches in new_matches
+        ]).astype(int)
+        return cls.get_precision_and_recall_from_counts(tps, active_preds, len(gt_boxes), score_thresholds, ious)
+
+    @classmethod
+    def match_class_boxes(cls, boxes, class_index, ious):
+        """Matches the predictions of a class of the prepared `DetectionBoxes` image by image, the predictions of an image are sorted by descending score.
+        Returns the indices of the predictions (within the class) on images with ground truths and their new match mask from `match_by_score`."""
+        gt_boxes, gt_image_codes, pred_boxes, pred_scores, pred_image_codes = boxes.get_class_boxes(class_index)
+        gt_images, gt_starts, gt_ends = boxes.split_by_image(gt_image_codes)
+        pred_images, pred_starts, pred_ends = boxes.split_by_image(pred_image_codes)
+        # predictions on images without ground truths are not counted
+        gt_image_indices = np.searchsorted(gt_images, pred_images).clip(max=max(len(gt_images)-1, 0))
+        has_gt = gt_images[gt_image_indices] == pred_images if len(gt_images) > 0 else np.zeros(len(pred_images), dtype=bool)
+
+        pred_indices, new_matches = [], []
+        for pred_start, pred_end, gt_image_index in zip(pred_starts[has_gt], pred_ends[has_gt], gt_image_indices[has_gt]):
+            image_ious = cls.calculate_ious(pred_boxes[pred_start:pred_end], gt_boxes[gt_starts[gt_image_index]:gt_ends[gt_image_index]])
+            pred_indices.append(np.arange(pred_start, pred_end))
+            new_matches.append(cls.match_by_score(image_ious, ious))
+        pred_indices = np.concatenate(pred_indices) if len(pred_indices) > 0 else np.zeros(0, dtype=int)
+        new_matches = np.concatenate(new_matches, axis=1) if len(new_matches) > 0 else np.zeros((len(ious), 0), dtype=bool)
+        return pred_indices, new_matches
 
-        if pred is None:
-            return {
-                "tp": np.array([0]), "fp": [sum(len(gt_boxes) for gt_boxes in gt.values())], "fn": np.array([0]),
+    @staticmethod
+    def get_empty_precision_and_recall(num_gt_boxes, ious):
+        """The metric data of a class without predictions."""
+        return {
+            iou: {
+                "tp": np.array([0]), "fp": [num_gt_boxes], "fn": np.array([0]),
                 "precision": np.array([0]), "recall": np.array([0]), "scores": np.array([0]),
                 "ap11": 0, "ap": 0, "monotonic_recalls": np.array([0]), "monotonic_precisions": np.array([0]),
                 "ap11_recalls": np.array([0]), "ap11_precisions": np.array([0])
-            }
-
-        scores = list(pred.keys())
-        pred_boxes = list(pred.values())
-        # loop over scores to calculate statistics for the score
-        for score_index, score in enumerate(scores):
-            score_tp, score_fp, score_fn = 0, 0, 0
-            # create dict with active predicitons (prediction with the same or higher score)
-            active_preds = {}
-            for pred_entry in pred_boxes[score_index:]:
-                for filename, bbox in zip(pred_entry["filename"], pred_entry["bboxes"]):
-                    if filename not in active_preds.keys():
-                        active_preds[filename] = [bbox]
-                    else:
-                        active_preds[filename].append(bbox)
-            # loop over gt images
-            for filename, image_gt_boxes in gt.items():
-                img_tp, img_fp, img_fn = self.get_image_stats(image_gt_boxes, active_preds.get(filename, None), iou)
-                score_tp += img_tp
-                score_fp += img_fp
-                score_fn += img_fn
-            # calculate precision and recall for the threshold
-            score_precision = score_tp/(score_tp + score_fp) if score_tp + score_fp > 0 else 0
-            score_recall = score_tp/(score_tp + score_fn) if score_tp + score_fn > 0 else 0
-
-            tps.append(score_tp)
-            fps.append(score_fp)
-            fns.append(score_fn)
-            precisions.append(score_precision)
-            recalls.append(score_recall)
-            score_thresholds.append(score)
-
-        # convert data to np.arrays for further processing
-        tps = np.array(tps)
-        fps = np.array(fps)
-        fns = np.array(fns)
-        precisions = np.array(precisions)
-        recalls = np.array(recalls)
-        score_thresholds = np.array(score_thresholds)
+            } for iou in ious
+        }
 
-        # calculate additional stats
+    @classmethod
+    def get_precision_and_recall_from_counts(cls, tps, active_preds, num_gt_boxes, score_thresholds, ious):
+        """Calculates the precision recall curves from the number of true positives (shape (num_ious, num_score_thresholds)) and active predictions per score threshold."""
+        iou_data = {}
+        for iou, iou_tps in zip(ious, tps):
+            fps = active_preds - iou_tps
+            fns = num_gt_boxes - iou_tps
+            with np.errstate(divide="ignore", invalid="ignore"):
+                precisions = np.where(iou_tps + fps > 0, iou_tps/(iou_tps + fps), 0)
+                recalls = np.where(iou_tps + fns > 0, iou_tps/(iou_tps + fns), 0)
+            iou_data[iou] = cls.get_ap_stats(iou_tps, fps, fns, precisions, recalls, score_thresholds)
+        return iou_data
 
+    @staticmethod
+    def get_ap_stats(tps, fps, fns, precisions, recalls, score_thresholds):
+        """Calculates AP11 and AP from the precision recall curve and returns them together with the curve."""
         # AP11
         precisions_at_recall_value = []
         for recall_value in np.linspace(0.0, 1.0, 11):
-            indices = np.argwhere(np.array(recalls) >= recall_value).flatten()
-            precision_max = max(precisions[indices]) if indices.size > 0 else 0
+            mask = recalls >= recall_value
+            precision_max = precisions[mask].max() if mask.any() else 0
             precisions_at_recall_value.append(precision_max)
         ap11 = np.mean(precisions_at_recall_value)
 
@@ -366,50 +579,27 @@ class APObjectDetectionFast:
         sorted_recalls = recalls[sorted_indices]
         sorted_precision = precisions[sorted_indices]
         # make the precision values monotonically
-        calc_recalls = [0] + sorted_recalls.tolist() + [1]
-        calc_precisions = [0] + sorted_precision.tolist() + [0]
-        for i in range(len(calc_recalls)-2, -1, -1):
-            calc_precisions[i] = max(calc_precisions[i], calc_precisions[i+1])
-        # get indices where the recall value changes
-        changing_index_list = []
-        for i in range(1, len(calc_recalls)):
-            if calc_recalls[i] != calc_recalls[i-1]:
-                changing_index_list.append(i)
-        ap = 0.0
-        for i in changing_index_list:
-            ap += ((calc_recalls[i]-calc_recalls[i-1])*calc_precisions[i])
+        calc_recalls = np.r_[0, sorted_recalls, 1]
+        calc_precisions = np.maximum.accumulate(np.r_[0, sorted_precision, 0][::-1])[::-1]
+        # get indices where the recall value changes, the areas are summed up in order
+        changing_indices = np.flatnonzero(calc_recalls[1:] != calc_recalls[:-1]) + 1
+        areas = (calc_recalls[changing_indices] - calc_recalls[changing_indices-1])*calc_precisions[changing_indices]
+        ap = float(np.cumsum(areas)[-1]) if len(areas) > 0 else 0.0
 
         return {
             "tp": tps, "fp": fps, "fn": fns, "precision": precisions, "recall": recalls, "scores": score_thresholds,
-            "ap11": ap11, "ap": ap, "monotonic_recalls": np.array(calc_recalls), "monotonic_precisions": np.array(calc_precisions),
+            "ap11": ap11, "ap": ap, "monotonic_recalls": calc_recalls, "monotonic_precisions": calc_precisions,
             "ap11_recalls": np.linspace(0.0, 1.0, 11), "ap11_precisions": np.array(precisions_at_recall_value)
         }
 
     @staticmethod
-    def prepare_data(df):
-        ground_truth, preds = df[df["is_prediction"] == False].sort_values("score"), df[df["is_prediction"] == True].sort_values("score")
-
-        pred_dict = {}
-        for index, row in preds.iterrows():
-            if row["label"] not in pred_dict.keys():
-                pred_dict[row["label"]] = {row["score"]: {"bboxes": [[row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]]], "filename": [row["filename"]]}}
-            else:
-                if not row["filename"] in pred_dict[row["label"]].keys():
-                    pred_dict[row["label"]][row["score"]] = {"bboxes": [[row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]]], "filename": [row["filename"]]}
-                else:
-                    pred_dict[row["label"]][row["score"]]["bboxes"].append([row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]])
-                    pred_dict[row["label"]][row["score"]]["filename"].append(row["filename"])
+    def get_image_id_col(df):
+        """Images are identified by their `filepath`, images of data without a filepath column by their `filename`."""
+        return "filepath" if "filepath" in df.columns else "filename"
 
-        gt_dict = {}
-        for index, row in ground_truth.iterrows():
-            if row["label"] not in gt_dict.keys():
-                gt_dict[row["label"]] = {row["filename"]: [[row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]]]}
-            else:
-                if not row["filename"] in gt_dict[row["label"]].keys():
-                    gt_dict[row["label"]][row["filename"]] = [[row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]]]
-                else:
-                    gt_dict[row["label"]]["filename"].append([row["bbox_xmin"], row["bbox_ymin"], row["bbox_xmax"], row["bbox_ymax"]])
-        return gt_dict, pred_dict
+    @classmethod
+    def prepare_data(cls, df):
+        return DetectionBoxes.from_dataframe(df, cls.get_image_id_col(df))
 
     @staticmethod
     def filter_data(df, filter_key_word):
@@ -422,20 +612,122 @@ class APObjectDetectionFast:
         elif filter_key_word == "AP_large":
             return df[96**2 < df["area"]]
 
+    @staticmethod
+    def get_mean_ap(class_data):
+        """The mean of the AP of the classes, NaN if no class of the analysis type has ground truths."""
+        aps = [class_entry["ap"] for class_entry in class_data.values()]
+        return np.array(aps).mean() if len(aps) > 0 else np.float64(np.nan)
+
+    @classmethod
+    def get_class_metric_data(cls, boxes, class_index, ious):
+        """Calculates the precision recall curves for all ious and their mean AP for a class of the prepared `DetectionBoxes`."""
+        iou_data = cls.get_precision_and_recall_for_ious(boxes, class_index, ious)
+        iou_data["ap"] = np.array([iou["ap"] for iou in iou_data.values()]).mean()
+        return iou_data
+
+    def get_class_metric_data_parallel(self, analysis_boxes, units):
+        """Calculates `get_class_metric_data` for the units (analysis_type, class_index) with the executor. Returns a dict with the units as keys."""
+        executor = ProcessPoolExecutor(self.executor) if isinstance(self.executor, int) else self.executor
+        shared_boxes = {}
+        try:
+            for analysis_type, boxes in analysis_boxes.items():
+                shared_boxes[analysis_type] = boxes.to_shared_memory()
+            # submit the units with the most predictions first, so the long running ones don't end up last
+            submit_order = sorted(units, key=lambda unit: analysis_boxes[unit[0]].num_pred_boxes(unit[1]), reverse=True)
+            futures = {
+                unit: executor.submit(calculate_class_metric_data_from_shared_memory, type(self), shared_boxes[unit[0]][1], unit[1], self.ious)
+                for unit in submit_order
+            }
+            return {unit: futures[unit].result() for unit in units}
+        finally:
+            if isinstance(self.executor, int):
+                executor.shutdown()
+            for shm, _ in shared_boxes.values():
+                shm.close()
+                shm.unlink()
+
     def get_metric_data(self):
+        analysis_boxes = {analysis_type: self.prepare_data(self.filter_data(self.data, analysis_type)) for analysis_type in self.ANALYSIS_TYPES}
+        # classes without ground truths are skipped
+        units = [
+            (analysis_type, class_index) for analysis_type, boxes in analysis_boxes.items()
+            for class_index in range(len(boxes.class_names)) if boxes.num_gt_boxes(class_index) > 0
+        ]
+        if self.executor is None:
+            unit_data = {unit: self.get_class_metric_data(analysis_boxes[unit[0]], unit[1], self.ious) for unit in units}
+        else:
+            unit_data = self.get_class_metric_data_parallel(analysis_boxes, units)
+
         analysis_data = {}
-        for analysis_type in ["AP", "AP_small", "AP_medium", "AP_large"]:
-            filtered_df = self.filter_data(self.data, analysis_type)
-            gt_dict, pred_dict = self.prepare_data(filtered_df)
-            class_names = gt_dict.keys()
+        for analysis_type, boxes in analysis_boxes.items():
+            class_data = {boxes.class_names[class_index]: unit_data[(unit_type, class_index)] for unit_type, class_index in units if unit_type == analysis_type}
+            class_data["map"] = self.get_mean_ap(class_data)
+            analysis_data[analysis_type] = class_data
+        return analysis_data
+
+    def reset(self):
+        """Removes all the data of the incremental calculation, including `data`."""
+        self.class_states = {analysis_type: {} for analysis_type in self.ANALYSIS_TYPES}
+
+    def init_class_states(self):
+        if self.class_states is None:
+            self.reset()
+            if self.data is not None:
+                self.update(self.data)
+
+    def update(self, batch_df):
+        """Adds a batch of data with the same columns as `data` to the incremental calculation.
+        The rows of images that were added before replace the previous rows of these images, the images are identified by `get_image_id_col`."""
+        self.init_class_states()
+        image_ids = pd.unique(batch_df[self.get_image_id_col(batch_df)])
+        for analysis_type in self.ANALYSIS_TYPES:
+            class_states = self.class_states[analysis_type]
+            for class_state in class_states.values():
+                class_state.remove_images(image_ids)
+            boxes = self.prepare_data(self.filter_data(batch_df, analysis_type))
+            for class_index, class_name in enumerate(boxes.class_names):
+                gt_boxes, gt_image_codes, _, pred_scores, pred_image_codes = boxes.get_class_boxes(class_index)
+                counted = np.zeros(len(pred_scores), dtype=bool)
+                new_matches = np.zeros((len(self.ious), len(pred_scores)), dtype=bool)
+                if len(gt_boxes) > 0 and len(pred_scores) > 0:
+                    pred_indices, class_new_matches = self.match_class_boxes(boxes, class_index, self.ious)
+                    counted[pred_indices] = True
+                    new_matches[:, pred_indices] = class_new_matches
+                gt_images, gt_starts, gt_ends = boxes.split_by_image(gt_image_codes)
+                class_state = class_states.setdefault(class_name, MatchState(len(self.ious)))
+                class_state.add(dict(zip(boxes.image_ids[gt_images], gt_ends - gt_starts)), pred_scores, boxes.image_ids[pred_image_codes], counted, new_matches)
+
+    def compute(self):
+        """Calculates the metric data of the incremental calculation, the result is also stored in `metric_data`."""
+        self.init_class_states()
+        analysis_data = {}
+        for analysis_type, class_states in self.class_states.items():
             class_data = {}
-            for class_name in class_names:
-                    iou_data = {}
-                    for iou in self.ious:
-                        res = self.get_precision_and_recall(gt_dict[class_name], pred_dict.get(class_name, None), iou)
-                        iou_data[iou] = res
-                    iou_data["ap"] = np.array([iou["ap"] for iou in iou_data.values()]).mean()
-                    class_data[class_name] = iou_data
-            class_data["map"] = np.array([class_entry["ap"] for class_entry in class_data.values()]).mean() if len(class_data.values()) > 0 else 0
+            # classes without ground truths are skipped
+            for class_name in sorted(class_states.keys()):
+                class_state = class_states[class_name]
+                if class_state.num_gt_boxes == 0:
+                    continue
+                if len(class_state.scores) == 0:
+                    iou_data = self.get_empty_precision_and_recall(class_state.num_gt_boxes, self.ious)
+                else:
+                    score_thresholds, active_preds, tps = class_state.get_counts()
+                    iou_data = self.get_precision_and_recall_from_counts(tps, active_preds, class_state.num_gt_boxes, score_thresholds, self.ious)
+                iou_data["ap"] = np.array([iou["ap"] for iou in iou_data.values()]).mean()
+                class_data[class_name] = iou_data
+            class_data["map"] = self.get_mean_ap(class_data)
             analysis_data[analysis_type] = class_data
-        return analysis_data
\ No newline at end of file
+        self.metric_data = analysis_data
+        return analysis_data
+
+# Cell
+def calculate_class_metric_data_from_shared_memory(ap_class, boxes_description, class_index, ious):
+    """Worker function for `APObjectDetectionFast.get_class_metric_data_parallel`, attaches to the shared boxes and calculates the metric data of a class."""
+    boxes = DetectionBoxes.from_shared_memory(boxes_description)
+    shm = boxes.shared_memory
+    try:
+        return ap_class.get_class_metric_data(boxes, class_index, ious)
+    finally:
+        # the arrays have to be released before the block can be closed
+        del boxes
+        shm.close()
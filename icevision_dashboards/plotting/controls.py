@@ -52,6 +52,9 @@ class Filter(metaclass=ABCMeta):
 
 # Cell
 class RangeFilter(Filter):
+    """A range slider filter with an optional histogram of the values. The histogram shows the values of the rows in the mask of `update_with_mask`,
+    the rows selected by other filters, the own selection is shown by the slider. The values are assigned to the bins of the histogram once,
+    on changes of the mask only the counts of the histogram are recalculated and the `top` column of its data source is replaced."""
     def __init__(self, data: np.ndarray, name: str, bins: int = 20, steps: int = 50, with_hist: bool = True, width: int = 500, height: int = 500) -> None:
         self.steps = steps
         self.step_width = (data.max()-data.min())/steps
@@ -68,17 +71,16 @@ class RangeFilter(Filter):
         val_min = val_min-0.01*dist
         val_max = val_max+0.01*dist
         self.slider = pnw.RangeSlider(name=self.name, start=val_min, end=val_max, step=round(((val_max-val_min)/self.steps), 1), width=int(0.97*self.width))
-        self.slider.param.watch(self.update_self, "value_throttled")
         if self.with_hist:
             self.hist = histogram(self.data, bins=self.bins, range=(self.data.min(), self.data.max()), height=100, width=self.width, remove_tools=True)
+            self.hist_source = self.hist.renderers[0].data_source
+            # bin of each value, the last bin includes the right edge like in np.histogram
+            edges = np.histogram_bin_edges(self.data, bins=self.bins, range=(self.data.min(), self.data.max()))
+            self.bin_indices = np.clip(np.searchsorted(edges, self.data, side="right") - 1, 0, self.bins-1)
         else:
             self.hist = None
         self.gui = pn.Column(self.slider, self.hist)
 
-    def update_self(self, event):
-        mask = self.get_selection()
-        self.update_with_mask(mask)
-
     def get_selection(self, inverted: bool = False) -> np.ndarray:
         selection = (self.data >= self.gui[0].value[0]) & (self.data <= self.gui[0].value[1])
         if inverted:
@@ -89,9 +91,7 @@ class RangeFilter(Filter):
         if self.hist is None:
             return
         else:
-            selection = self.data[np.logical_and(self.get_selection(), mask)]
-            self.hist = histogram(selection, bins=self.bins, range=(self.data.min(), self.data.max()), height=100, width=self.width, remove_tools=True)
-            self.gui[1] = self.hist
+            self.hist_source.data["top"] = np.bincount(self.bin_indices[np.asarray(mask, dtype=bool)], minlength=self.bins)
 
     def register_callback(self, callback):
         callback = self.mask_callback(callback)
@@ -125,8 +125,12 @@ class CategoricalFilter(Filter):
         self.selector.param.watch(callback, "value")
 
     def update_with_mask(self, mask: np.ndarray, disabel_callbacks=True):
-        """This does not work yet, maybe the whole structure needs to be changed to be based on the param lib."""
-        self.selector.value = list(set([element for element, mask_value in zip(self.data, mask) if mask_value]))
+        """Deselects the categories without rows in the mask. The selection is only narrowed, categories that were deselected
+        (by the user or by an earlier mask) are not selected again when the mask gets wider."""
+        categories_in_mask = set(np.asarray(self.data)[np.asarray(mask, dtype=bool)].tolist())
+        value = [element for element in self.selector.value if element in categories_in_mask]
+        if value != list(self.selector.value):
+            self.selector.value = value
 
 # Cell
 class TimeFilter(Filter):
@@ -163,13 +167,22 @@ class TimeFilter(Filter):
 
 # Cell
 class ScatterFilter(Filter):
-    """A filter based on a scatter plot with a lasso selection."""
-    def __init__(self, x, y, x_label: str = "", y_label: str = "", width: int = 500, height: int = 500):
+    """A filter based on a scatter plot with a lasso selection. With more than `max_points` points (or if `aggregate` is True) the points are shown with a
+    `RasterizedScatterPlot` and the lasso selection is resolved on the server."""
+    def __init__(self, x, y, x_label: str = "", y_label: str = "", width: int = 500, height: int = 500, aggregate: Optional[bool] = None, max_points: int = 200000):
         self.x_label = x_label
         self.y_label = y_label
+        self.aggregate = len(x) > max_points if aggregate is None else aggregate
         super().__init__((x,y), width=width, height=height)
 
     def build_gui(self):
+        if self.aggregate:
+            self.rasterized_plot = RasterizedScatterPlot(self.data[0], self.data[1], colors=["#1f77b4", "firebrick"], x_label=self.x_label, y_label=self.y_label, width=self.width, height=self.height)
+            # show the selected points in a different color
+            self.rasterized_plot.register_callback(lambda selection: self.rasterized_plot.update_categories(selection.astype(int)))
+            self.figure = self.rasterized_plot.figure
+            self.gui = pn.Row(self.figure)
+            return
         self.source = ColumnDataSource({"x": self.data[0], "y": self.data[1]})
         p = figure(x_axis_label=self.x_label, y_axis_label=self.y_label, width=self.width, height=self.height, tools="lasso_select")
         p.scatter("x", "y", source=self.source)
@@ -178,35 +191,84 @@ class ScatterFilter(Filter):
         self.gui = pn.Row(self.figure)
 
     def get_selection(self):
+        if self.aggregate:
+            return self.rasterized_plot.selection
         selected_indices = self.source.selected.indices
         selection = [False if i not in selected_indices else True for i in range(len(self.data[0]))]
         return selection
 
     def register_callback(self, callback):
         callback = self.mask_callback(callback)
-        self.source.selected.on_change("indices", callback)
+        if self.aggregate:
+            self.rasterized_plot.register_callback(callback)
+        else:
+            self.source.selected.on_change("indices", callback)
 
     def show(self):
         return self.gui
 
 # Cell
 class GenericMulitScatterFilter(Filter):
-    """A generic filter base on the scatter plot filter, that provides additional inputs for column selection and how the selections over the different columns should be combined."""
-    def __init__(self, data, columns: Optional[List[str]] = None, mode: str = "symmetric", width: int = 500, height: int = 500):
+    """A generic filter base on the scatter plot filter, that provides additional inputs for column selection and how the selections over the different columns should be combined.
+    With more than `max_points` rows (or if `aggregate` is True) the points are shown with a `RasterizedScatterPlot` and the lasso selections are resolved on the server.
+    The selections of all column combinations are stored as bits in `selection_bits` (one row of packed bits per column combination), `pair_indices` maps
+    each (x, y) column combination to its row. In symmetric mode x-y and y-x share the same row."""
+    def __init__(self, data, columns: Optional[List[str]] = None, mode: str = "symmetric", width: int = 500, height: int = 500, aggregate: Optional[bool] = None, max_points: int = 200000):
         """mode: symmetric (default) or singular. If symmetric for a specific x-y combination the corrosponding y-x combination will be updated with the same values. Else they have different selections."""
         self.mode = mode
         self.columns = columns if columns is not None else data.columns
-        self.source = ColumnDataSource(data)
-        self.source.selected.on_change("indices", self.update_selection)
-        self.selections = {x_key: {y_key: [False]*data.shape[0] for y_key in self.columns} for x_key in self.columns}
+        self.aggregate = data.shape[0] > max_points if aggregate is None else aggregate
+        self._callbacks = []
+        if self.aggregate:
+            self.source = None
+        else:
+            self.source = ColumnDataSource(data)
+            self.source.selected.on_change("indices", self.update_selection)
+        self.num_rows = data.shape[0]
+        self.pair_indices = self.get_pair_indices(self.columns, mode)
+        self.selection_bits = np.zeros((max(self.pair_indices.values()) + 1, (self.num_rows + 7)//8), dtype=np.uint8)
+        self._showing_combined_selection = False
         super().__init__(data, width, height)
 
+    @staticmethod
+    def get_pair_indices(columns: List[str], mode: str = "symmetric") -> dict:
+        """Maps every (x, y) column combination to a row of `selection_bits`."""
+        pair_indices, num_pairs = {}, 0
+        for x_key in columns:
+            for y_key in columns:
+                if mode == "symmetric" and (y_key, x_key) in pair_indices:
+                    pair_indices[(x_key, y_key)] = pair_indices[(y_key, x_key)]
+                else:
+                    pair_indices[(x_key, y_key)] = num_pairs
+                    num_pairs += 1
+        return pair_indices
+
+    def get_pair_selection(self, x_key: str, y_key: str) -> np.ndarray:
+        """Returns the selection of a column combination as boolean mask."""
+        return np.unpackbits(self.selection_bits[self.pair_indices[(x_key, y_key)]], count=self.num_rows).astype(bool)
+
+    def set_pair_selection(self, x_key: str, y_key: str, selection: np.ndarray):
+        self.selection_bits[self.pair_indices[(x_key, y_key)]] = np.packbits(np.asarray(selection, dtype=bool))
+
+    def indices_to_mask(self, indices: Iterable[int]) -> np.ndarray:
+        mask = np.zeros(self.num_rows, dtype=bool)
+        mask[np.asarray(indices, dtype=int)] = True
+        return mask
+
     def update_selection(self, attr, old, new):
-        self.selections[self.x_select.value][self.y_select.value] = [True if index in new else False for index in range(len(self.selections[self.x_select.value][self.y_select.value]))]
-        if self.mode == "symmetric":
-            self.selections[self.y_select.value][self.x_select.value] = [True if index in new else False for index in range(len(self.selections[self.x_select.value][self.y_select.value]))]
+        # showing the combined selection in the plot is not a new selection of the current columns
+        if self._showing_combined_selection:
+            return
+        self.set_pair_selection(self.x_select.value, self.y_select.value, self.indices_to_mask(new))
         self.source.data["colors"] = self.get_colors()
 
+    def update_selection_with_mask(self, selection):
+        """Sets the selection of the current columns from the lasso selection of the `RasterizedScatterPlot`."""
+        self.set_pair_selection(self.x_select.value, self.y_select.value, selection)
+        self.rasterized_plot.update_categories(self.get_color_categories())
+        for callback in self._callbacks:
+            callback(self.get_selection())
+
     def update_plot(self, event):
         self.gui[3] = self.scatter_plot()
 
@@ -230,23 +292,19 @@ class GenericMulitScatterFilter(Filter):
         )
 
     def scatter_plot(self):
+        if self.aggregate:
+            self.rasterized_plot = RasterizedScatterPlot(
+                self.data[self.x_select.value].values, self.data[self.y_select.value].values, self.get_color_categories(), colors=["gray", "fuchsia", "firebrick"],
+                x_label=self.x_select.value, y_label=self.y_select.value, width=self.width, height=self.height-50
+            )
+            self.rasterized_plot.register_callback(self.update_selection_with_mask)
+            return self.rasterized_plot.figure
         p = figure(x_axis_label=self.x_select.value, y_axis_label=self.y_select.value, width=self.width, height=self.height-50, tools="lasso_select")
-        # get selections
-        if self.combine_selections.value == "None":
-            combined_selection_selected = self.selections[self.x_select.value][self.y_select.value]
-        else:
-            # put all singel selections into one list so they can be iterated over with zip
-            if "Ignore empty selections" in self.ignore_empty_selections.value:
-                single_selections = [selection for layer_1 in self.selections.values() for selection in layer_1.values() if any(selection)]
-                if len(single_selections) == 0:
-                    single_selections = [selection for selection in single_selections if any(selection)]
-            else:
-                single_selections = [selection for layer_1 in self.selections.values() for selection in layer_1.values()]
-            if self.combine_selections.value == "And":
-                combined_selection_selected = [all(point_selections) for point_selections in zip(*single_selections)]
-            else:
-                combined_selection_selected = [any(point_selections) for point_selections in zip(*single_selections)]
-        self.source.selected.indices = [index for index, value in enumerate(combined_selection_selected) if value]
+        self._showing_combined_selection = True
+        try:
+            self.source.selected.indices = np.flatnonzero(self.get_selection()).tolist()
+        finally:
+            self._showing_combined_selection = False
         self.source.data["colors"] = self.get_colors()
         radius = (self.data[self.x_select.value].max()-self.data[self.x_select.value].min() + self.data[self.y_select.value].max()-self.data[self.y_select.value].min())* 0.01
         p.scatter(self.x_select.value, self.y_select.value, source=self.source, fill_color="colors", line_color=None, radius=radius)
@@ -254,33 +312,25 @@ class GenericMulitScatterFilter(Filter):
         return p
 
     def get_colors(self):
-        # create colors from selections
-        colors = ["gray"]*self.data.shape[0]
-        current_selections =self.selections[self.x_select.value][self.y_select.value]
-        single_selections = [selection for layer_1 in self.selections.values() for selection in layer_1.values()]
-        any_selections = [any(point_selections) for point_selections in zip(*single_selections)]
-        for index, (any_selection, current_selection) in enumerate(zip(any_selections, current_selections)):
-            if any_selection is True and current_selection is False:
-                colors[index] = "fuchsia"
-            elif current_selection is True:
-                colors[index] = "firebrick"
-        return colors
+        return np.array(["gray", "fuchsia", "firebrick"])[self.get_color_categories()].tolist()
+
+    def get_color_categories(self) -> np.ndarray:
+        """Color index of each point for the `RasterizedScatterPlot`: 0 not selected, 1 selected in another column combination and 2 selected in the current one."""
+        current_selection = self.get_pair_selection(self.x_select.value, self.y_select.value)
+        any_selection = np.unpackbits(np.bitwise_or.reduce(self.selection_bits, axis=0), count=self.num_rows).astype(bool)
+        return np.where(current_selection, 2, any_selection.astype(int))
 
     def get_selection(self):
         if self.combine_selections.value == "None":
-            selection = [value for value in self.selections[self.x_select.value][self.y_select.value]]
-        else:
-            if "Ignore empty selections" in self.ignore_empty_selections.value:
-                single_selections = [selection for layer_1 in self.selections.values() for selection in layer_1.values() if any(selection)]
-                if len(single_selections) == 0:
-                    single_selections = [selection for selection in single_selections if any(selection)]
-            else:
-                single_selections = [selection for layer_1 in self.selections.values() for selection in layer_1.values()]
-            if self.combine_selections.value == "And":
-                selection = [all(point_selections) for point_selections in zip(*single_selections)]
-            else:
-                selection = [any(point_selections) for point_selections in zip(*single_selections)]
-        return selection
+            return self.get_pair_selection(self.x_select.value, self.y_select.value)
+        selection_bits = self.selection_bits
+        if "Ignore empty selections" in self.ignore_empty_selections.value:
+            non_empty = selection_bits.any(axis=1)
+            # if all selections are empty the combined selection is empty as well
+            if non_empty.any():
+                selection_bits = selection_bits[non_empty]
+        combine = np.bitwise_and if self.combine_selections.value == "And" else np.bitwise_or
+        return np.unpackbits(combine.reduce(selection_bits, axis=0), count=self.num_rows).astype(bool)
 
     def mask_callback(self, callback):
         def new_callback(attr, old, new):
@@ -288,6 +338,9 @@ class GenericMulitScatterFilter(Filter):
         return new_callback
 
     def register_callback(self, callback):
+        if self.aggregate:
+            self._callbacks.append(callback)
+            return
         callback = self.mask_callback(callback)
         self.source.selected.on_change("indices", callback)
 
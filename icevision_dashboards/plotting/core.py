@@ -1,21 +1,23 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/plotting.core.ipynb (unless otherwise specified).
 
 __all__ = ['barplot', 'histogram', 'heatmap', 'time_arc_plot', 'table_from_dataframe', 'stacked_hist',
-           'categorical_2d_histogram', 'categorical_2d_histogram_with_gui', 'scatter_plot_with_gui', 'plots_as_matrix']
+           'categorical_2d_histogram', 'categorical_2d_histogram_with_gui', 'scatter_plot_with_gui',
+           'RasterizedScatterPlot', 'plots_as_matrix']
 
 # Cell
 import datetime
-from typing import Literal, List, Union, Iterable, Tuple, Optional
+from typing import Literal, List, Union, Iterable, Tuple, Optional, Callable
 
 import numpy as np
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 import bokeh
 from bokeh.plotting import figure, show
-from bokeh.models import ColumnDataSource, TableColumn, DataTable, LinearColorMapper, ColorBar
+from bokeh.models import ColumnDataSource, TableColumn, DataTable, LinearColorMapper, ColorBar, LassoSelectTool
 from bokeh.models.widgets import HTMLTemplateFormatter
 from bokeh.palettes import Viridis, viridis, Category20
 from bokeh.transform import factor_cmap
+from bokeh.colors import named
 from bokeh.layouts import gridplot
 from bokeh import events
 import panel as pn
@@ -476,6 +478,85 @@ def scatter_plot_with_gui(dataframe: pd.DataFrame, x_cols: list = None, y_cols:
 
     return gui
 
+# Cell
+class RasterizedScatterPlot:
+    """Scatter plot for large numbers of points, the point density is rasterized on the server at the resolution of the plot and only the image is send
+    to the browser. The image is rendered again for the visible ranges after zooming or panning. Lasso selections are resolved against all points
+    with `points_in_polygon`, the mask of the selected points is stored in `selection` and passed to the registered callbacks.
+    The points are colored by their `categories` (index into `colors`), a pixel with points of multiple categories gets the color of the highest category."""
+    def __init__(self, x: np.ndarray, y: np.ndarray, categories: Optional[np.ndarray] = None, colors: List[str] = ["navy"], x_label: str = "", y_label: str = "", width: int = 500, height: int = 500):
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.categories = categories
+        self.colors = [self.to_rgb(color) for color in colors]
+        self.width = width
+        self.height = height
+        self.selection = np.zeros(len(self.x), dtype=bool)
+        self._callbacks = []
+        self.figure = self.build_figure(x_label, y_label)
+
+    @staticmethod
+    def to_rgb(color: Union[str, Tuple[int, int, int]]) -> Tuple[int, int, int]:
+        """Converts a named color (e.g. "firebrick") or a hex color (e.g. "#b22222") to a rgb tuple."""
+        if not isinstance(color, str):
+            return tuple(color)
+        if color.startswith("#"):
+            return tuple(int(color[index:index+2], 16) for index in (1, 3, 5))
+        rgb = getattr(named, color).to_rgb()
+        return rgb.r, rgb.g, rgb.b
+
+    def build_figure(self, x_label, y_label):
+        x_min, x_max = (self.x.min(), self.x.max()) if len(self.x) > 0 else (0, 1)
+        y_min, y_max = (self.y.min(), self.y.max()) if len(self.y) > 0 else (0, 1)
+        # add a margin, so the points at the border are visible
+        x_margin, y_margin = max(x_max - x_min, 1e-9)*0.02, max(y_max - y_min, 1e-9)*0.02
+        p = figure(
+            x_axis_label=x_label, y_axis_label=y_label, width=self.width, height=self.height, tools="lasso_select,pan,wheel_zoom,box_zoom,reset",
+            x_range=(x_min - x_margin, x_max + x_margin), y_range=(y_min - y_margin, y_max + y_margin)
+        )
+        p.select_one(LassoSelectTool).continuous = False
+        self.source = ColumnDataSource({"image": [], "x": [], "y": [], "dw": [], "dh": []})
+        p.image_rgba(image="image", x="x", y="y", dw="dw", dh="dh", source=self.source)
+        p.on_event(events.RangesUpdate, self._ranges_update)
+        p.on_event(events.SelectionGeometry, self._selection_geometry)
+        self.render((p.x_range.start, p.x_range.end), (p.y_range.start, p.y_range.end))
+        return p
+
+    def render(self, x_range: Tuple[float, float], y_range: Tuple[float, float]):
+        """Rasterizes the points in the visible ranges and replaces the image of the plot."""
+        self.x_range, self.y_range = x_range, y_range
+        counts = rasterize_points(self.x, self.y, x_range, y_range, self.width, self.height, self.categories, len(self.colors))
+        self.source.data = {
+            "image": [shade_counts(counts, self.colors)], "x": [x_range[0]], "y": [y_range[0]],
+            "dw": [x_range[1] - x_range[0]], "dh": [y_range[1] - y_range[0]]
+        }
+
+    def update_categories(self, categories: np.ndarray):
+        self.categories = categories
+        self.render(self.x_range, self.y_range)
+
+    def _ranges_update(self, event):
+        if None not in (event.x0, event.x1, event.y0, event.y1):
+            self.render((event.x0, event.x1), (event.y0, event.y1))
+
+    def _selection_geometry(self, event):
+        if not event.final or event.geometry.get("type") != "poly":
+            return
+        self.select_polygon(event.geometry["x"], event.geometry["y"])
+
+    def select_polygon(self, polygon_x: Iterable[float], polygon_y: Iterable[float]):
+        """Selects the points inside of the polygon and triggers the callbacks with the new selection."""
+        self.selection = points_in_polygon(self.x, self.y, polygon_x, polygon_y)
+        for callback in self._callbacks:
+            callback(self.selection)
+
+    def register_callback(self, callback: Callable):
+        """The callback is called with the mask of the selected points after every lasso selection."""
+        self._callbacks.append(callback)
+
+    def show(self):
+        return self.figure
+
 # Cell
 def plots_as_matrix(plots, ncols, nrows, width=500, height=500):
     """Takes a list of plots and puts them into a matrix"""
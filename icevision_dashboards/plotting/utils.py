@@ -1,19 +1,24 @@
 # AUTOGENERATED! DO NOT EDIT! File to edit: nbs/plotting.utils.ipynb (unless otherwise specified).
 
 __all__ = ['toggle_legend_js', 'calculate_mixing_matrix', 'get_min_and_max_dates',
-           'convert_rgb_image_to_bokeh_rgb_image', 'draw_record_with_bokeh']
+           'convert_rgb_image_to_bokeh_rgb_image', 'get_display_scale', 'open_img_at_display_size',
+           'scale_record_to_img', 'points_in_polygon', 'rasterize_points', 'shade_counts', 'draw_record_with_bokeh']
 
 # Cell
 import datetime
-from typing import Union, Tuple, Iterable
+from copy import deepcopy
+from typing import Union, Tuple, Iterable, Optional, List
 
 import numpy as np
 import pandas as pd
+from scipy import sparse
+from PIL import Image, ImageOps
 
 from bokeh.plotting import figure, show
 from bokeh.models import CustomJS
 
-from icevision.visualize.draw_data import draw_record
+from icevision.visualize.draw_data import draw_record, draw_sample
+from icevision.core.bbox import BBox
 
 # Cell
 def toggle_legend_js(figure):
@@ -29,36 +34,32 @@ def toggle_legend_js(figure):
     return toggle_legend_js
 
 # Cell
-def calculate_mixing_matrix(data: pd.DataFrame, mixing_col: str, mixing_objects: str, return_df: bool = True) -> Union[Tuple[np.ndarray, dict], pd.DataFrame]:
+def calculate_mixing_matrix(data: pd.DataFrame, mixing_col: str, mixing_objects: str, return_df: bool = True, counts: bool = False) -> Union[Tuple[np.ndarray, dict], pd.DataFrame]:
     """Calculates mixing matrix for the mixing_objects column where they mix in the mixing_col.
     By standard the object class mixing matrix over the images is calculated.
     Returns the mixing matrix and the mapping between label and mixing matrix index.
-    If return_df is True (default) a dataframe (instead of the mixing matrix) will be returned that can be directly consumed by histogram_2d."""
+    If return_df is True (default) a dataframe (instead of the mixing matrix) will be returned that can be directly consumed by histogram_2d.
+    By default an entry counts the images that contain both classes (on the diagonal the images with more than one object of the class), if `counts` is True
+    it counts the pairs of objects of the two classes in all images (on the diagonal the pairs of different objects of the same class)."""
+    group_codes, groups = pd.factorize(data[mixing_col])
+    object_codes, objects = pd.factorize(data[mixing_objects], sort=True)
+    valid = (group_codes >= 0) & (object_codes >= 0)
     # map labels to the mixing matrix index
-    mapping = {i:j for j,i in enumerate(np.sort(data[mixing_objects].unique()))}
-    num_unique_mixing_objects = data[mixing_objects].nunique()
-    mixing_matrix = np.zeros([num_unique_mixing_objects, num_unique_mixing_objects])
-    mixing_groups = data.groupby(mixing_col)
-    # iterate over each individual element with the same mixing_col to calculate the mixing based on the mixing_objects
-    for group_key, group in mixing_groups:
-        # handel self mixing
-        for value, count in group[mixing_objects].value_counts().iteritems():
-            if count > 1:
-                mixing_matrix[mapping[value], mapping[value]] += 1
-        # handel mixing of different objects
-        permutations = np.array(np.meshgrid(group[mixing_objects].unique(), group[mixing_objects].unique())).T.reshape(-1,2)
-        for permutation in permutations:
-            # avoid double counting in the self mixing
-            if permutation[0] != permutation[1]:
-                mixing_matrix[mapping[permutation[0]], mapping[permutation[1]]] += 1
+    mapping = {value: index for index, value in enumerate(objects)}
+    # number of objects of each class (columns) in each image (rows), duplicate entries are summed up
+    object_counts = sparse.csr_matrix((np.ones(valid.sum()), (group_codes[valid], object_codes[valid])), shape=(len(groups), len(objects)))
+    if counts:
+        mixing_matrix = (object_counts.T @ object_counts).toarray()
+        mixing_matrix[np.diag_indices_from(mixing_matrix)] = np.asarray(object_counts.multiply(object_counts - object_counts.sign()).sum(axis=0)).ravel() / 2
+    else:
+        presence = object_counts.sign()
+        mixing_matrix = (presence.T @ presence).toarray()
+        mixing_matrix[np.diag_indices_from(mixing_matrix)] = np.asarray((object_counts > 1).sum(axis=0)).ravel()
 
     if return_df:
-        df_dict = {"values": [], "col_name": [], "row_name": []}
-        for row_name, row in zip(mapping, mixing_matrix):
-            df_dict["values"] += row.tolist()
-            df_dict["row_name"] += [row_name]*len(mapping)
-            df_dict["col_name"] += mapping
-        return pd.DataFrame(df_dict)
+        return pd.DataFrame({
+            "values": mixing_matrix.ravel(), "col_name": np.tile(objects, len(objects)), "row_name": np.repeat(objects, len(objects))
+        })
     return mixing_matrix, mapping
 
 # Cell
@@ -73,16 +74,113 @@ def get_min_and_max_dates(dates: Iterable[datetime.datetime]) -> Tuple[datetime.
 
 # Cell
 def convert_rgb_image_to_bokeh_rgb_image(img: np.ndarray) -> np.ndarray:
-    """Convertes a image in the form of a numpy array to an array that can be shown by bokeh."""
-    img = np.flipud(img)
-    img = img.astype(np.uint8)
-    bokeh_img = np.empty((img.shape[0],img.shape[1]), dtype=np.uint32)
-    view = bokeh_img.view(dtype=np.uint8).reshape((img.shape[0],img.shape[1], 4))
-    view[:,:, 0] = img[:,:,0]
-    view[:,:, 1] = img[:,:,1]
-    view[:,:, 2] = img[:,:,2]
-    view[:,:, 3] = 255
-    return bokeh_img
+    """Convertes a image in the form of a numpy array (grayscale, RGB or RGBA) to an array that can be shown by bokeh.
+    Each channel is copied once from a flipped view of the image into the new uint32 buffer."""
+    height, width = img.shape[:2]
+    out = np.empty((height, width), dtype=np.uint32)
+    flipped_img = img[::-1].reshape(height, width, -1)
+    view = out.view(dtype=np.uint8).reshape((height, width, 4))
+    # copying channel by channel is faster than a single copy with an innermost dimension of length 3 or 4
+    for channel in range(3):
+        view[:, :, channel] = flipped_img[:, :, channel if flipped_img.shape[2] >= 3 else 0]
+    view[:, :, 3] = flipped_img[:, :, 3] if flipped_img.shape[2] == 4 else 255
+    return out
+
+# Cell
+def get_display_scale(img_width: int, img_height: int, width: Optional[int] = None, height: Optional[int] = None) -> float:
+    """Returns the factor to scale an image to fit into `width` x `height` while keeping the aspect ratio, a None value is not constrained. Images are never upscaled."""
+    scales = [1.]
+    if width is not None:
+        scales.append(width/img_width)
+    if height is not None:
+        scales.append(height/img_height)
+    return min(scales)
+
+# Cell
+def open_img_at_display_size(filepath, width: Optional[int] = None, height: Optional[int] = None) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Opens an image as RGB numpy array scaled down to fit into `width` x `height` (see `get_display_scale`). JPEGs are decoded at a reduced
+    resolution (`PIL.Image.draft`), so the full image is never decoded. The EXIF orientation is applied like in icevision's `open_img`.
+    Returns the image and the (width, height) of the full size image."""
+    with Image.open(filepath) as img:
+        img_width, img_height = img.size
+        # orientations 5 to 8 rotate the image by 90 degrees
+        is_rotated = img.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+        if is_rotated:
+            img_width, img_height = img_height, img_width
+        scale = get_display_scale(img_width, img_height, width, height)
+        display_size = (max(round(img_width*scale), 1), max(round(img_height*scale), 1))
+        img.draft("RGB", display_size[::-1] if is_rotated else display_size)
+        display_img = ImageOps.exif_transpose(img).convert("RGB")
+    if display_img.size != display_size:
+        display_img = display_img.resize(display_size, Image.BILINEAR, reducing_gap=2.)
+    return np.array(display_img), (img_width, img_height)
+
+# Cell
+def scale_record_to_img(record, img: np.ndarray, img_width: int, img_height: int):
+    """Returns a copy of the record with `img` as image and the boxes scaled from the `img_width` x `img_height` of the full image to the size of `img`."""
+    scale_x, scale_y = img.shape[1]/img_width, img.shape[0]/img_height
+    sample = deepcopy(record)
+    sample.set_img(img)
+    for composite in sample.task_composites.values():
+        bboxes = getattr(composite, "bboxes", None)
+        if bboxes:
+            composite.set_bboxes([BBox.from_xyxy(bbox.xmin*scale_x, bbox.ymin*scale_y, bbox.xmax*scale_x, bbox.ymax*scale_y) for bbox in bboxes])
+    return sample
+
+# Cell
+def points_in_polygon(x: np.ndarray, y: np.ndarray, polygon_x: Iterable[float], polygon_y: Iterable[float]) -> np.ndarray:
+    """Returns a mask of the points (`x`, `y`) that are inside of the polygon, using the even-odd rule. The points in the bounding box of the polygon
+    are sorted by y once, so each edge of the polygon is only tested against the continuous slice of points in its y-range."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    polygon_x, polygon_y = np.asarray(polygon_x, dtype=float), np.asarray(polygon_y, dtype=float)
+    inside = np.zeros(len(x), dtype=bool)
+    if len(polygon_x) < 3:
+        return inside
+    candidates = np.flatnonzero((x >= polygon_x.min()) & (x <= polygon_x.max()) & (y >= polygon_y.min()) & (y <= polygon_y.max()))
+    order = np.argsort(y[candidates], kind="stable")
+    candidates = candidates[order]
+    sorted_x, sorted_y = x[candidates], y[candidates]
+    sorted_inside = np.zeros(len(candidates), dtype=bool)
+    for x_start, y_start, x_end, y_end in zip(polygon_x, polygon_y, np.roll(polygon_x, -1), np.roll(polygon_y, -1)):
+        if y_start == y_end:
+            continue
+        # the edge crosses the horizontal line through the points with min(y_start, y_end) <= y < max(y_start, y_end)
+        start, end = np.searchsorted(sorted_y, [min(y_start, y_end), max(y_start, y_end)], side="left")
+        # flip the points left of the crossing
+        crossing_x = (x_end - x_start) * (sorted_y[start:end] - y_start) / (y_end - y_start) + x_start
+        sorted_inside[start:end] ^= sorted_x[start:end] < crossing_x
+    inside[candidates] = sorted_inside
+    return inside
+
+# Cell
+def rasterize_points(x: np.ndarray, y: np.ndarray, x_range: Tuple[float, float], y_range: Tuple[float, float], width: int, height: int, categories: Optional[np.ndarray] = None, num_categories: int = 1) -> np.ndarray:
+    """Counts the points in each pixel of a `width` x `height` raster of the visible ranges, points outside of the ranges are ignored.
+    Returns the counts with the shape (num_categories, height, width), the first row is at the bottom (`y_range[0]`) like in bokeh images.
+    `categories` are integers in [0, num_categories) for each point, the points of each category are counted separately."""
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    visible = (x >= x_range[0]) & (x <= x_range[1]) & (y >= y_range[0]) & (y <= y_range[1])
+    x_bins = ((x[visible] - x_range[0]) * (width / max(x_range[1] - x_range[0], 1e-12))).astype(np.int64).clip(0, width-1)
+    y_bins = ((y[visible] - y_range[0]) * (height / max(y_range[1] - y_range[0], 1e-12))).astype(np.int64).clip(0, height-1)
+    pixel_indices = y_bins*width + x_bins
+    if categories is not None:
+        pixel_indices += np.asarray(categories, dtype=np.int64)[visible] * (width*height)
+    return np.bincount(pixel_indices, minlength=num_categories*width*height).reshape(num_categories, height, width)
+
+# Cell
+def shade_counts(counts: np.ndarray, colors: List[Tuple[int, int, int]], min_alpha: int = 60) -> np.ndarray:
+    """Converts the counts of `rasterize_points` into a bokeh RGBA image. Each pixel gets the color of the highest category with points in it and an
+    alpha value that increases with the logarithm of the number of points in the pixel, empty pixels are transparent."""
+    num_categories, height, width = counts.shape
+    occupied = counts > 0
+    # index of the highest category with points in the pixel
+    top_category = num_categories - 1 - np.argmax(occupied[::-1], axis=0)
+    total_counts = counts.sum(axis=0)
+    log_counts = np.log1p(total_counts)
+    alpha = np.where(total_counts > 0, min_alpha + (255 - min_alpha) * log_counts / max(log_counts.max(), 1e-12), 0)
+    img = np.empty((height, width, 4), dtype=np.uint8)
+    img[:, :, :3] = np.asarray(colors, dtype=np.uint8)[top_category]
+    img[:, :, 3] = alpha
+    return img.view(np.uint32)[:, :, 0]
 
 # Cell
 def draw_record_with_bokeh(
@@ -96,34 +194,48 @@ def draw_record_with_bokeh(
     width=None,
     height=None
 ):
-    """Draws a record or returns a bokeh figure containing the image."""
-    img = draw_record(
-            record=record,
-            class_map=class_map,
-            display_label=display_label,
-            display_bbox=display_bbox,
-            display_mask=display_mask,
-            display_keypoints=display_keypoints,
-        )
+    """Draws a record or returns a bokeh figure containing the image. If `width` or `height` is given the image is decoded at the display size
+    and the boxes are drawn on the small image, the axes of the figure still use the coordinates of the full image. Masks and keypoints are always drawn on the full image."""
+    if (width is not None or height is not None) and not (display_mask or display_keypoints) and getattr(record, "img", None) is None:
+        display_img, (img_width, img_height) = open_img_at_display_size(record.filepath, width, height)
+        img = draw_sample(
+                sample=scale_record_to_img(record, display_img, img_width, img_height),
+                class_map=class_map,
+                display_label=display_label,
+                display_bbox=display_bbox,
+                display_mask=False,
+                display_keypoints=False,
+                font_size=12,
+            )
+    else:
+        img = draw_record(
+                record=record,
+                class_map=class_map,
+                display_label=display_label,
+                display_bbox=display_bbox,
+                display_mask=display_mask,
+                display_keypoints=display_keypoints,
+            )
+        img_width, img_height = img.shape[1], img.shape[0]
 
     # create bokeh figure with the plot
     bokeh_img = convert_rgb_image_to_bokeh_rgb_image(img)
 
     # make sure the aspect ratio of the image is retained, if only the width of hight is given
     if width is None and height is not None:
-        plot_width = int(img.shape[1]/img.shape[0] * height)
+        plot_width = int(img_width/img_height * height)
         plot_height = height
     elif height is None and width is not None:
         plot_width = width
-        plot_height = int(img.shape[0]/img.shape[1] * width)
+        plot_height = int(img_height/img_width * width)
     else:
-        plot_width = img.shape[1] if width is None else width
-        plot_height = img.shape[0] if height is None else height
+        plot_width = img_width if width is None else width
+        plot_height = img_height if height is None else height
 
-    p = figure(tools="reset, wheel_zoom, box_zoom, save, pan", width=plot_width, height=plot_height, x_range=(0, img.shape[1]), y_range=(img.shape[0], 0), x_axis_location="above")
+    p = figure(tools="reset, wheel_zoom, box_zoom, save, pan", width=plot_width, height=plot_height, x_range=(0, img_width), y_range=(img_height, 0), x_axis_location="above")
     p.xgrid.grid_line_color = None
     p.ygrid.grid_line_color = None
-    p.image_rgba([bokeh_img], x=0, y=img.shape[0], dw=img.shape[1], dh=img.shape[0], level="image")
+    p.image_rgba([bokeh_img], x=0, y=img_height, dw=img_width, dh=img_height, level="image")
     if return_figure:
         return p
     else: